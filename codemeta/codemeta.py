@@ -7,12 +7,13 @@
 # CLST, Radboud University Nijmegen
 # & KNAW Humanities Cluster
 # GPL v3
-import re
 import sys
 import argparse
 import json
 import os.path
 import random
+import io
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Optional, Sequence, Tuple
 from pathlib import Path
 import setuptools
@@ -32,11 +33,14 @@ from codemeta.common import (
     add_triple,
     generate_uri,
     remap_uri,
+    remap_uris,
+    iter_reachable,
     query,
     enrich,
     compose,
     correct,
-    bind_graph,
+    process_resources,
+    scratch_graph,
 )
 import codemeta.crosswalk
 import codemeta.parsers.python
@@ -48,9 +52,11 @@ import codemeta.parsers.rust
 import codemeta.parsers.web
 import codemeta.parsers.gitapi
 import codemeta.parsers.authors
+import codemeta.remote
 import codemeta.validation
-from codemeta.serializers.jsonld import serialize_to_jsonld
-from codemeta.serializers.turtle import serialize_to_turtle
+from codemeta.serializers.jsonld import serialize_to_jsonld, serialize_to_jsonld_lines
+from codemeta.serializers.turtle import serialize_to_turtle, write_turtle
+from codemeta.serializers.ntriples import write_ntriples
 
 
 # class PostDevelopCommand(setuptools.command.develop.develop):
@@ -164,7 +170,7 @@ def main():
         "--outputtype",
         dest="output",
         type=str,
-        help="Output type: json (default), turtle",
+        help="Output type: json (default), ndjson (line-delimited json, one resource per line, useful with --graph), turtle, turtle-stream (faster but less pretty turtle), ntriples, nquads. May be a comma separated list to produce multiple outputs from a single build, pass the same number of output files to -O then.",
         action="store",
         required=False,
         default="json",
@@ -174,7 +180,7 @@ def main():
         "--outputfile",
         dest="outputfile",
         type=str,
-        help="Output file",
+        help="Output file (or a comma separated list of output files if multiple output types are specified)",
         action="store",
         required=False,
     )
@@ -235,6 +241,15 @@ def main():
         action="store_true",
         required=False,
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of worker processes to use for framing and serialising the resources when outputting a graph of multiple resources as line-delimited json (--graph -o ndjson), can not be combined with -o json",
+        action="store",
+        required=False,
+        default=1,
+    )
     parser.add_argument(
         "--interpreter",
         help="Start interactive python interpreter after loading the graph",
@@ -257,10 +272,58 @@ def main():
     parser.add_argument(
         "--no-cache",
         dest="no_cache",
-        help="Do not cache context files, force redownload",
+        help="Do not cache context files or git API responses, force redownload",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--crawl-services",
+        dest="crawl_services",
+        help="Fetch the url/serviceUrl of all services (isSourceCodeOf) found in the metadata, and add the metadata found there to the services. Pages are fetched concurrently.",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--forge",
+        dest="forge",
+        help="Declare the kind of git forge that runs on a host, as HOST=KIND where KIND is github, gitlab or none, so the host need not be probed. May be specified multiple times (the environment variable CODEMETAPY_FORGES may hold a comma separated list as well)",
+        action="append",
+        required=False,
+    )
+    parser.add_argument(
+        "--github-graphql",
+        dest="github_graphql",
+        help="Query GitHub repositories via the GraphQL API, in a single request per batch of repositories rather than multiple REST API requests per repository. Requires GITHUB_TOKEN to be set.",
         action="store_true",
         required=False,
     )
+    parser.add_argument(
+        "--record",
+        dest="record",
+        type=str,
+        metavar="DIR",
+        help="Record the responses to all remote requests in this cassette directory, so the run can later be replayed offline with --replay (may also be set via the environment variables CODEMETAPY_HTTP_MODE=record and CODEMETAPY_CASSETTE)",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "--replay",
+        dest="replay",
+        type=str,
+        metavar="DIR",
+        help="Serve all remote requests from this cassette directory (recorded with --record) rather than the network (may also be set via the environment variables CODEMETAPY_HTTP_MODE=replay and CODEMETAPY_CASSETTE)",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "--replay-latency",
+        dest="replay_latency",
+        type=str,
+        metavar="SECONDS",
+        help="Delay each replayed response by this many seconds, or by the time the original request took if set to 'recorded'. Use with --replay (may also be set via the environment variable CODEMETAPY_REPLAY_LATENCY)",
+        action="store",
+        required=False,
+    )
     parser.add_argument(
         "--no-extras",
         dest="no_extras",
@@ -314,6 +377,8 @@ def main():
             )
 
     args = parser.parse_args()
+    if args.jobs > 1 and "json" in (x.strip() for x in args.output.split(",")):
+        parser.error("--jobs is only supported for line-delimited json output (-o ndjson), not for -o json")
     if not args.strict:
         args.with_stypes = True
 
@@ -329,28 +394,33 @@ def main():
             )
 
     valid = False
-    if args.graph:
-        # join multiple inputs into a larger graph
-        g, res, args, contextgraph = read(
-            **args.__dict__
-        )  # may deliver a res when args.select is set
-    else:
-        # normal behaviour
-        g, res, args, contextgraph = build(**args.__dict__)
-    if args.validate:
-        if res:
-            valid, _ = codemeta.validation.validate(g, res, args, contextgraph)
+    # the cassette also covers the context downloads during serialisation
+    with codemeta.remote.use_cassette(get_cassette(args)):
+        if args.graph:
+            # join multiple inputs into a larger graph
+            g, res, args, contextgraph = read(
+                **args.__dict__
+            )  # may deliver a res when args.select is set
         else:
-            raise Exception(
-                "Validation can only be done on single resources, not when --graph is set and multiple are loaded/aggregated"
-                ""
-            )
+            # normal behaviour
+            g, res, args, contextgraph = build(**args.__dict__)
+        if args.validate:
+            if res:
+                valid, _ = codemeta.validation.validate(g, res, args, contextgraph)
+            else:
+                raise Exception(
+                    "Validation can only be done on single resources, not when --graph is set and multiple are loaded/aggregated"
+                    ""
+                )
 
-    if args.includecontext:
-        g += contextgraph
-    output = serialize(g, res, args, contextgraph)
-    if output:
-        print(output)
+        if args.includecontext:
+            g += contextgraph
+        if not args.outputfile:
+            # standard output, streaming output types (ndjson) are written to it as they are produced
+            args.outputfile = "-"
+        output = serialize(g, res, args, contextgraph)
+        if output:
+            print(output)
 
     if args.interpreter:
         print("Starting interactive shell: variable 'g' holds the rdflib.Graph")
@@ -397,32 +467,101 @@ def serialize(
     args: AttribDict,
     contextgraph: Union[Graph, None] = None,
     sparql_query: Optional[str] = None,
+    outputs: Optional[Sequence[Tuple[str, Optional[str]]]] = None,
     **kwargs,
 ) -> Optional[str]:
-    if args.output == "json":
-        if sparql_query:
-            res = [x[0] for x in query(g, sparql_query)]
+    """Serialize the graph to the output type and output file set in args (both may also be comma separated lists),
+    or to all the explicitly passed outputs, a list of (output type, output file) pairs. All outputs are produced from
+    the same graph, if there are multiple then the part of the graph reachable from the selected resource(s) is
+    computed only once and shared between them. Any output not written to file is returned."""
+    if sparql_query:
+        res = [x[0] for x in query(g, sparql_query)]
+    if outputs is None:
+        outputtypes = args.output.split(",") if args.output else ["json"]
+        outputfiles = args.outputfile.split(",") if args.outputfile else []
+        outputs = [
+            (
+                outputtype.strip(),
+                outputfiles[i].strip() if i < len(outputfiles) else None,
+            )
+            for i, outputtype in enumerate(outputtypes)
+        ]
+    subjects = None
+    if len(outputs) > 1 and res:
+        subjects = list(
+            iter_reachable(g, res if isinstance(res, (list, tuple)) else [res])
+        )
+    results = []
+    for outputtype, outputfile in outputs:
+        result = serialize_output(g, res, args, outputtype, outputfile, subjects)
+        if result is not None:
+            results.append(result)
+    if results:
+        return "\n".join(results)
+    return None
+
+
+def serialize_output(
+    g: Graph,
+    res: Union[Sequence, URIRef, BNode, None],
+    args: AttribDict,
+    outputtype: str,
+    outputfile: Optional[str],
+    subjects: Optional[list] = None,
+) -> Optional[str]:
+    """Serialize the graph to a single output type. Subjects may hold the precomputed nodes reachable from the resource(s), for RDF serialisations."""
+    if outputtype == "json":
+        if args.jobs and int(args.jobs) > 1:
+            # the framing of the graph output is not independent per resource, it can't be distributed
+            raise ValueError("Parallel serialisation (jobs) is only supported for line-delimited json output (ndjson), not for json")
         doc = serialize_to_jsonld(g, res, args)
-        if args.outputfile and args.outputfile != "-":
-            with open(args.outputfile, "w", encoding="utf-8") as fp:
+        if outputfile and outputfile != "-":
+            with open(outputfile, "w", encoding="utf-8") as fp:
                 fp.write(json.dumps(doc, indent=4, ensure_ascii=False, sort_keys=True))
         else:
             return json.dumps(doc, indent=4, ensure_ascii=False, sort_keys=True)
-    elif args.output in ("turtle", "ttl"):
-        if sparql_query:
-            res = [x[0] for x in query(g, sparql_query)]
-        doc = serialize_to_turtle(g, res)
-        if args.outputfile and args.outputfile != "-":
-            with open(args.outputfile, "wb") as fp:
+    elif outputtype in ("ndjson", "jsonl"):
+        lines = serialize_to_jsonld_lines(g, res, args, encode=True)
+        if outputfile:
+            # written incrementally as each resource is framed
+            if outputfile == "-":
+                for line in lines:
+                    sys.stdout.write(line + "\n")  # type: ignore
+                    sys.stdout.flush()
+            else:
+                with open(outputfile, "w", encoding="utf-8") as fp:
+                    for line in lines:
+                        fp.write(line + "\n")  # type: ignore
+        else:
+            return "\n".join(lines)  # type: ignore
+    elif outputtype in ("turtle", "ttl"):
+        doc = serialize_to_turtle(g, res, subjects)
+        if outputfile and outputfile != "-":
+            with open(outputfile, "wb") as fp:
                 fp.write(doc.encode('utf-8'))
         else:
             return doc
-    elif args.output == "html":
+    elif outputtype in ("turtle-stream", "ttl-stream", "ntriples", "nt", "nquads", "nq"):
+        # streaming writers, these write directly to the output file without building any intermediate graph
+        if outputtype in ("turtle-stream", "ttl-stream"):
+            writer = write_turtle
+        else:
+            writer = lambda g, res, fp, subjects: write_ntriples(
+                g, res, fp, quads=outputtype in ("nquads", "nq"), subjects=subjects
+            )
+        if outputfile and outputfile != "-":
+            with open(outputfile, "w", encoding="utf-8") as fp:
+                writer(g, res, fp, subjects)
+        else:
+            fp = io.StringIO()
+            writer(g, res, fp, subjects)
+            return fp.getvalue()
+    elif outputtype == "html":
         raise Exception(
             "Output type html is no longer handled by codemetapy but has moved to codemeta2html: https://github.com/proycon/codemeta2html"
         )
     else:
-        raise Exception("No such output type: ", args.output)
+        raise Exception("No such output type: ", outputtype)
 
 
 def reidentify(
@@ -431,14 +570,16 @@ def reidentify(
     identifier: Optional[str],
     founduris: list,
     args: AttribDict,
+    mapping: Optional[dict] = None,
 ) -> Union[URIRef, BNode]:
-    """Reassign a new URI for the resource, or assign an original found one. The former will include a version component"""
+    """Reassign a new URI for the resource, or assign an original found one. The former will include a version component.
+    If a mapping is passed, the remapping is only recorded in it and left for the caller to apply (using remap_uris())"""
     if founduris and not args.baseuri:
         # restore the exact original URI because we did not set a baseuri
         founduri = founduris[0]
         if res != founduri:
             print(f"Remapping URI to found URI: {res} -> {founduri}", file=sys.stderr)
-            remap_uri(g, res, founduri)
+            remap(g, res, founduri, mapping)
             res = URIRef(founduri)
     elif args.baseuri:
         for founduri in founduris:
@@ -468,22 +609,46 @@ def reidentify(
                 f"Remapping URI to (possibly) new identifier and version component: {res} -> {uri}",
                 file=sys.stderr,
             )
-            remap_uri(g, res, uri)
+            remap(g, res, uri, mapping)
             res = URIRef(uri)
     return res
 
 
+def remap(g: Graph, res: Union[URIRef, BNode], uri, mapping: Optional[dict] = None):
+    """Remap a resource now, or record it in the mapping for later"""
+    if mapping is None:
+        remap_uri(g, res, uri)
+    else:
+        mapping[res] = URIRef(uri)
+
+
 def get_identifier(g: Graph, res: Union[URIRef, BNode]) -> Optional[str]:
     for _, _, o in g.triples((res, SDO.identifier, None)):
         if not str(o).startswith(("http://", "https://")) and not ":" in str(o):
             return str(o).strip("/ ")
 
 
+def get_cassette(args: AttribDict) -> Optional[codemeta.remote.Cassette]:
+    """Returns the cassette to record remote requests to or replay them from, if requested via --record or --replay"""
+    if args.record or args.replay:
+        return codemeta.remote.Cassette(
+            args.record or args.replay,
+            "record" if args.record else "replay",
+            args.replay_latency
+            or os.environ.get("CODEMETAPY_REPLAY_LATENCY", 0),
+        )
+    return None
+
+
 def read(**kwargs) -> Tuple[Graph, Union[URIRef, None], AttribDict, Graph]:
     """Read multiple resources together in a codemeta graph, and either output it all or output a selection"""
 
     args = AttribDict(kwargs)
+    with codemeta.remote.use_cassette(get_cassette(args)):
+        return _read(args)
 
+
+def _read(args: AttribDict) -> Tuple[Graph, Union[URIRef, None], AttribDict, Graph]:
     g, contextgraph = init_graph(args)
 
     if not args.inputsources:
@@ -493,8 +658,11 @@ def read(**kwargs) -> Tuple[Graph, Union[URIRef, None], AttribDict, Graph]:
         print(f"Adding json-ld file from {source} to graph", file=sys.stderr)
         codemeta.parsers.jsonld.parse_jsonld(g, None, getstream(source), args)
 
-    # remap resource identifiers (URIs) when needed
-    for s, _, _ in g.triples((None, RDF.type, SDO.SoftwareSourceCode)):
+    # remap resource identifiers (URIs) when needed, the remappings are collected first and applied in one go
+    # reidentify() may still add owl:sameAs triples, so the resources are listed before any of them is processed
+    mapping = {}
+    resources = []
+    for s in list(g.subjects(RDF.type, SDO.SoftwareSourceCode, unique=True)):
         if isinstance(s, (URIRef, BNode)):
             identifier = get_identifier(g, s)
             if isinstance(s, URIRef) and str(s).startswith("http"):
@@ -502,10 +670,11 @@ def read(**kwargs) -> Tuple[Graph, Union[URIRef, None], AttribDict, Graph]:
             else:
                 founduris = []
             # ensure the proper URI is set
-            s = reidentify(g, s, identifier, founduris, args)
-            # run some automatic corrections on the graph for this resource
-            correct(g, s, args)
-            reconcile(g, s, args)
+            resources.append(reidentify(g, s, identifier, founduris, args, mapping))
+    remap_uris(g, mapping)
+
+    # run some automatic corrections (and optionally enrichment) on the graph for all resources
+    process_resources(g, resources, args, args.enrich)
 
     if args.select:
         res = URIRef(args.select)
@@ -520,6 +689,17 @@ def read(**kwargs) -> Tuple[Graph, Union[URIRef, None], AttribDict, Graph]:
 def build(**kwargs) -> Tuple[Graph, URIRef, AttribDict, Graph]:
     """Build a codemeta graph for a single resource, may be composed from different sources"""
     args = AttribDict(kwargs)
+    with codemeta.remote.use_cassette(get_cassette(args)):
+        return _build(args)
+
+
+def _build(args: AttribDict) -> Tuple[Graph, URIRef, AttribDict, Graph]:
+    fetchlog_start = len(codemeta.remote.FETCHLOG)
+
+    if args.forge:
+        codemeta.parsers.gitapi.FORGES.update(
+            codemeta.parsers.gitapi.parse_forges(args.forge)
+        )
 
     inputsources = []
     if args.inputsources:
@@ -606,7 +786,8 @@ def build(**kwargs) -> Tuple[Graph, URIRef, AttribDict, Graph]:
         else:
             raise Exception("No input files specified (use - for stdin)")
 
-    g, contextgraph = init_graph(args)
+    # the sources are composed in layers, rather than copied into the main graph one by one
+    g, contextgraph = init_graph(args, layered=True)
 
     if args.baseuri:
         args.baseuri = args.baseuri.strip('" ')
@@ -642,90 +823,131 @@ def build(**kwargs) -> Tuple[Graph, URIRef, AttribDict, Graph]:
 
     founduris = []  # stores all fully qualified URIs we find fot the main resource
 
-    l = len(inputsources)
-    for i, (source, inputtype) in enumerate(inputsources):
-        print(f"Processing source #{i+1} of {l}", file=sys.stderr)
+    # all network-bound sources (web pages and git APIs) are fetched concurrently in background workers while the local
+    # sources are parsed; the results are composed in the declared order below, so precedence is unaffected
+    executor = ThreadPoolExecutor(max_workers=8)
+    try:
+        websources = {}
+        for source, inputtype in inputsources:
+            if inputtype == "web" and source not in websources:
+                websources[source] = executor.submit(
+                    codemeta.parsers.web.parse_web_graph, res, source, args
+                )
+        gitsources = codemeta.parsers.gitapi.submit_many(
+            executor,
+            [
+                (source, inputtype)
+                for source, inputtype in inputsources
+                if inputtype in ("github", "gitlab", "gitapi")
+            ],
+            args,
+        )
 
-        newgraph = Graph()
-        bind_graph(newgraph)
+        l = len(inputsources)
+        for i, (source, inputtype) in enumerate(inputsources):
+            print(f"Processing source #{i+1} of {l}", file=sys.stderr)
 
-        if inputtype == "null":
-            print(
-                f"Starting from scratch, using command line parameters to build",
-                file=sys.stderr,
-            )
-        elif inputtype == "python":
-            print(f"Obtaining python package metadata for: {source}", file=sys.stderr)
-            # source is a name of a package or path to a pyproject.toml file
-            codemeta.parsers.python.parse_python(newgraph, res, source, crosswalk, args)
-        elif inputtype == "debian":
-            print(f"Parsing debian package from {source}", file=sys.stderr)
-            with getstream(source) as f:
-                aptlines = f.read().split("\n")
-            codemeta.parsers.debian.parse_debian(
-                newgraph, res, aptlines, crosswalk, args
-            )
-        elif inputtype == "nodejs":
-            print(f"Parsing npm package.json from {source}", file=sys.stderr)
-            with getstream(source) as f:
-                codemeta.parsers.nodejs.parse_nodejs(newgraph, res, f, crosswalk, args)
-        elif inputtype == "rust":
-            print(f"Parsing rust Cargo.toml from {source}", file=sys.stderr)
-            with getstream(source) as f:
-                codemeta.parsers.rust.parse_rust(newgraph, res, f, args)
-        elif inputtype == "java":
-            print(f"Parsing java/maven pom.xml from {source}", file=sys.stderr)
-            with getstream(source) as f:
-                codemeta.parsers.java.parse_java(newgraph, res, f, crosswalk, args)
-        elif inputtype == "json":
-            print(f"Parsing json-ld file from {source}", file=sys.stderr)
-            with getstream(source) as f:
-                founduri = codemeta.parsers.jsonld.parse_jsonld(newgraph, res, f, args)
-            if founduri and founduri not in founduris:
-                founduris.append(founduri)
-        elif inputtype == "web":
-            print(
-                f"Fallback: Obtaining metadata from remote URL {source}",
-                file=sys.stderr,
-            )
-            found = False
-            for targetres in codemeta.parsers.web.parse_web(
-                newgraph, res, source, args
-            ):
-                if targetres and args.with_stypes:
-                    found = True
-                    print(f"Adding service (isSourceCodeOf) {source}", file=sys.stderr)
-                    g.add((res, CODEMETA.isSourceCodeOf, targetres))
-            if not found:
-                print(f"(no metadata found at remote URL)", file=sys.stderr)
-        elif inputtype in ("github", "gitlab", "gitapi"):
-            # e.g. transform git@gitlab.com/X in https://gitlab.com/X
-            source = re.sub(r"git@(.*):", r"https://\1/", source)
-            if source.endswith(".git"):
-                source = source[:-4]
-            if inputtype == "gitapi":  # disambiguate
-                inputtype = codemeta.parsers.gitapi.get_repo_kind(source)
-            if inputtype:
+            newgraph = scratch_graph()
+
+            if inputtype == "null":
+                print(
+                    f"Starting from scratch, using command line parameters to build",
+                    file=sys.stderr,
+                )
+            elif inputtype == "python":
+                print(f"Obtaining python package metadata for: {source}", file=sys.stderr)
+                # source is a name of a package or path to a pyproject.toml file
+                codemeta.parsers.python.parse_python(newgraph, res, source, crosswalk, args)
+            elif inputtype == "debian":
+                print(f"Parsing debian package from {source}", file=sys.stderr)
+                with getstream(source) as f:
+                    aptlines = f.read().split("\n")
+                codemeta.parsers.debian.parse_debian(
+                    newgraph, res, aptlines, crosswalk, args
+                )
+            elif inputtype == "nodejs":
+                print(f"Parsing npm package.json from {source}", file=sys.stderr)
+                with getstream(source) as f:
+                    codemeta.parsers.nodejs.parse_nodejs(newgraph, res, f, crosswalk, args)
+            elif inputtype == "rust":
+                print(f"Parsing rust Cargo.toml from {source}", file=sys.stderr)
+                with getstream(source) as f:
+                    codemeta.parsers.rust.parse_rust(newgraph, res, f, args)
+            elif inputtype == "java":
+                print(f"Parsing java/maven pom.xml from {source}", file=sys.stderr)
+                with getstream(source) as f:
+                    codemeta.parsers.java.parse_java(newgraph, res, f, crosswalk, args)
+            elif inputtype == "json":
+                print(f"Parsing json-ld file from {source}", file=sys.stderr)
+                with getstream(source) as f:
+                    founduri = codemeta.parsers.jsonld.parse_jsonld(newgraph, res, f, args)
+                if founduri and founduri not in founduris:
+                    founduris.append(founduri)
+            elif inputtype == "web":
+                print(
+                    f"Fallback: Obtaining metadata from remote URL {source}",
+                    file=sys.stderr,
+                )
+                newgraph, targets = websources[source].result()
+                found = False
+                for targetres in targets:
+                    if targetres and args.with_stypes:
+                        found = True
+                        print(f"Adding service (isSourceCodeOf) {source}", file=sys.stderr)
+                        g.add((res, CODEMETA.isSourceCodeOf, targetres))
+                if not found:
+                    print(f"(no metadata found at remote URL)", file=sys.stderr)
+            elif inputtype in ("github", "gitlab", "gitapi"):
+                # the repo kind is determined (for gitapi) and the API responses are obtained in the background
+                repo_kind, responses = gitsources[(source, inputtype)].result()
+                # e.g. transform git@gitlab.com/X in https://gitlab.com/X
+                source = codemeta.parsers.gitapi.normalize_source(source)
                 print(f"Querying GitAPI parser for {source}", file=sys.stderr)
-                codemeta.parsers.gitapi.parse(newgraph, res, source, inputtype, args)
-            else:
-                raise ValueError(f"Unable to disambiguate gitapi type")
-        elif inputtype in ("authors", "contributors", "maintainers"):
-            print(f"Extracting {inputtype} from {source}", file=sys.stderr)
-            if inputtype == "authors":
-                prop = SDO.author
-            elif inputtype == "contributors":
-                prop = SDO.contributor
-            elif inputtype == "maintainers":
-                prop = CODEMETA.maintainer
-            with getstream(source) as f:
-                codemeta.parsers.authors.parse_authors(
-                    newgraph, res, f, args, property=prop
+                # owners already in the main graph (e.g. of other repositories) are reused
+                codemeta.parsers.gitapi.parse(
+                    newgraph, res, source, repo_kind, args, responses, lookup=g
                 )
-        elif inputtype is not None:
-            raise ValueError(f"Unknown input type: {inputtype}")
-
-        compose(g, newgraph, res, args)
+            elif inputtype in ("authors", "contributors", "maintainers"):
+                print(f"Extracting {inputtype} from {source}", file=sys.stderr)
+                if inputtype == "authors":
+                    prop = SDO.author
+                elif inputtype == "contributors":
+                    prop = SDO.contributor
+                elif inputtype == "maintainers":
+                    prop = CODEMETA.maintainer
+                with getstream(source) as f:
+                    codemeta.parsers.authors.parse_authors(
+                        newgraph, res, f, args, property=prop
+                    )
+            elif inputtype is not None:
+                raise ValueError(f"Unknown input type: {inputtype}")
+
+            compose(g, newgraph, res, args)
+
+        if args.crawl_services and args.with_stypes:
+            # fetch the pages of the services found in the metadata (concurrently), to fill in what we don't know about them yet
+            discovered = [
+                (service, url)
+                for service, url in codemeta.parsers.web.discover_service_urls(g, res)
+                if url not in websources
+            ]
+            for _, url in discovered:
+                if url not in websources:
+                    websources[url] = executor.submit(
+                        codemeta.parsers.web.parse_web_graph, res, url, args
+                    )
+            for service, url in discovered:
+                print(f"Crawling service URL {url}", file=sys.stderr)
+                try:
+                    newgraph, targets = websources[url].result()
+                except Exception as e:
+                    # a service that is down should not break the build
+                    print(f"(unable to obtain metadata from {url}: {e})", file=sys.stderr)
+                    continue
+                codemeta.parsers.web.add_service_metadata(g, service, newgraph, targets)
+    finally:
+        # also when a source fails: don't leave queued fetches running in the background
+        executor.shutdown(wait=False, cancel_futures=True)
 
     # Process command-line arguments last
     for key in props:
@@ -746,6 +968,9 @@ def build(**kwargs) -> Tuple[Graph, URIRef, AttribDict, Graph]:
         # Some automatic infererence and enrichment
         enrich(g, res, args)
 
+    if len(codemeta.remote.FETCHLOG) > fetchlog_start:
+        print(codemeta.remote.fetch_report(fetchlog_start), file=sys.stderr)
+
     return (g, res, args, contextgraph)
 
 
@@ -1,18 +1,21 @@
 import sys
 import os
 import json
-import requests
 import random
 import re
 import unicodedata
 
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
 from tempfile import gettempdir
 from rdflib import Graph, Namespace, URIRef, BNode, Literal
+from rdflib.store import Store, TripleAddedEvent, TripleRemovedEvent
 from rdflib.namespace import RDF, RDFS, SKOS #type: ignore
-from typing import Union, Sequence, Optional,Generator
+from typing import Union, Sequence, Optional, Generator, Iterable, Iterator
 from collections import OrderedDict
 from nameparser import HumanName
+from codemeta.terms import SDO, CODEMETA, SOFTWARETYPES, SOFTWAREIODATA, intern_literal
+from codemeta.remote import fetch, get_cassette
 
 
 PROGLANG_PYTHON = {
@@ -22,12 +25,7 @@ PROGLANG_PYTHON = {
     "url": "https://www.python.org",
 }
 
-SDO = Namespace("http://schema.org/")
-
-CODEMETA = Namespace("https://codemeta.github.io/terms/")
-#Custom extensions not in codemeta/schema.org (yet), they are initially proposed in https://github.com/codemeta/codemeta/issues/271
-SOFTWARETYPES = Namespace("https://w3id.org/software-types#") #See https://github.com/SoftwareUnderstanding/software_types
-SOFTWAREIODATA = Namespace("https://w3id.org/software-iodata#") #See https://github.com/SoftwareUnderstanding/software-iodata
+#SDO, CODEMETA, SOFTWARETYPES and SOFTWAREIODATA are interned namespaces from codemeta.terms, they are the most frequently used
 TRL = Namespace("https://w3id.org/research-technology-readiness-levels#")
 
 REPOSTATUS = Namespace("https://www.repostatus.org/#")
@@ -267,6 +265,7 @@ PREFER_URIREF_PROPERTIES = (SDO.license,  CODEMETA.developmentStatus, CODEMETA.c
 
 #properties that should prefer Literal rather than URIRef 
 PREFER_LITERAL_PROPERTIES = (SDO.url, SDO.codeRepository, SDO.downloadUrl, SDO.contentUrl, SDO.installUrl, SDO.serviceUrl, SDO.discussionUrl, SDO.targetUrl, SDO.thumbnailUrl, SDO.trackingUrl)
+PREFER_LITERAL_PROPERTIES_SET = frozenset(PREFER_LITERAL_PROPERTIES) #for fast membership tests
 
 
 
@@ -283,6 +282,206 @@ class AttribDict(dict):
     def __setattr__(self, key, value):
         super().__setattr__(key,value)
 
+class GraphIndex:
+    """Auxiliary indexes that codemetapy maintains for a graph, to speed up frequent lookups. Obtain it using get_graph_index()"""
+    def __init__(self):
+        #maps (subject, property) to OrderedListIndex instances
+        self.orderedlists = {}
+        self._identities = None
+        #maps resources to ResourceView instances
+        self.views = {}
+        #maps (forge host, user id or login) to the Person/Organization node of that forge user
+        self.forge_users = {}
+        #incremented whenever the graph changes, see changed()
+        self.generation = 0
+
+    def changed(self, event=None):
+        """Invalidates the resource views, called for every triple that is added to or removed from the graph (via the events of the store) and by touch_graph()"""
+        self.generation += 1
+
+    def identities(self, g: Graph) -> "IdentityIndex":
+        """Returns the index of persons and organizations, synchronised with the graph"""
+        if self._identities is None:
+            self._identities = IdentityIndex()
+        self._identities.sync(g)
+        return self._identities
+
+def get_graph_index(g: Graph) -> GraphIndex:
+    """Returns the auxiliary indexes for the graph, they are created on first use and live as long as the graph"""
+    try:
+        return g._codemetapy_index #type: ignore
+    except AttributeError:
+        index = GraphIndex()
+        g._codemetapy_index = index #type: ignore
+        #stores report additions (and some report removals too), a removal without addition always changes the size of the graph
+        g.store.dispatcher.subscribe(TripleAddedEvent, index.changed)
+        g.store.dispatcher.subscribe(TripleRemovedEvent, index.changed)
+        return index
+
+def touch_graph(g: Graph):
+    """Signals that the graph was changed, invalidating any resource views. Only needed for changes the store does not report (e.g. changes to a layer of a LayeredStore)"""
+    get_graph_index(g).changed()
+
+class ResourceView:
+    """A snapshot of the properties of a resource (its outgoing triples), so the various stages that process a resource need not probe the graph for the same values over and over.
+    The view refreshes itself whenever a triple was added to or removed from the graph, or when touch_graph() was called. Obtain it using get_resource_view()"""
+    def __init__(self, g: Graph, res: Union[URIRef,BNode]):
+        self.g = g
+        self.res = res
+        self.properties = {}
+        self.generation = None
+        self.graphsize = None
+
+    def _sync(self):
+        generation = get_graph_index(self.g).generation
+        graphsize = len(self.g)
+        if self.generation != generation or self.graphsize != graphsize:
+            properties = defaultdict(list)
+            for p, o in self.g.predicate_objects(self.res):
+                properties[p].append(o)
+            self.properties = properties
+            self.generation = generation
+            self.graphsize = graphsize
+        return self.properties
+
+    def value(self, prop: URIRef, default=None):
+        """Returns a value for the property, like Graph.value()"""
+        values = self._sync().get(prop)
+        return values[0] if values else default
+
+    def objects(self, prop: URIRef) -> tuple:
+        """Returns all values for the property"""
+        return tuple(self._sync().get(prop, ()))
+
+    def __contains__(self, prop: URIRef) -> bool:
+        return prop in self._sync()
+
+    @property
+    def identifier(self) -> str:
+        """The identifier used in messages: schema:identifier if present, the URI otherwise"""
+        return str(self.value(SDO.identifier) or self.res)
+
+def get_resource_view(g: Graph, res: Union[URIRef,BNode]) -> ResourceView:
+    """Returns the (shared) view on the properties of the resource"""
+    views = get_graph_index(g).views
+    view = views.get(res)
+    if view is None:
+        view = views[res] = ResourceView(g, res)
+    return view
+
+class OrderedListIndex:
+    """Keeps track of the tail and the members of an RDF ordered list (rdf:first, rdf:rest), so we can append to it and check for duplicates without walking the entire list"""
+    def __init__(self, head: Union[URIRef,BNode]):
+        self.head = head
+        self.tail = head
+        self.last = None #the last member
+        self.members = set()
+
+    @staticmethod
+    def build(g: Graph, head: Union[URIRef,BNode]) -> "OrderedListIndex":
+        """Builds the index for an existing list by walking it once"""
+        index = OrderedListIndex(head)
+        collection = head
+        while True:
+            index.last = g.value(collection, RDF.first)
+            index.members.add(index.last)
+            end = g.value(collection, RDF.rest)
+            if end == RDF.nil or not end:
+                break
+            collection = end
+        if not end:
+            raise Exception(f"Unable to find end of ordered list {collection}")
+        index.tail = collection
+        return index
+
+    def valid(self, g: Graph, head) -> bool:
+        """Tests whether the index is still valid for the graph (it may have been changed by other means)"""
+        return self.head == head and (self.tail, RDF.rest, RDF.nil) in g and (self.tail, RDF.first, self.last) in g
+
+    def contains(self, g: Graph, object, idpropmap: dict) -> bool:
+        """Is the object, or an object with the same value for any of the identifying properties, already in the list?"""
+        if object in self.members:
+            return True
+        for prop, value in idpropmap.items():
+            #look up the resources with this value in the graph itself, identifying properties may have been set after the members were added
+            for member in g.subjects(prop, value):
+                if member in self.members and g.value(member, prop) == value:
+                    return True
+        return False
+
+    def append(self, tail: Union[URIRef,BNode], object):
+        self.tail = tail
+        self.last = object
+        self.members.add(object)
+
+
+def normalize_identity(value) -> str:
+    """Normalises a name or e-mail address for identity comparison"""
+    return " ".join(str(value).split()).casefold()
+
+class IdentityIndex:
+    """Index of Person and Organization nodes by normalised name and e-mail address, used for duplicate detection"""
+    def __init__(self):
+        self.persons = {} #maps (givenName, familyName) to a node
+        self.organizations = {} #maps name to a node
+        self.mails = { SDO.Person: {}, SDO.Organization: {} } #maps type to a table mapping e-mail addresses to a node
+        self.nodes = set() #(node, type) pairs that have been indexed
+        self.graphsize = None #size of the graph when the index was last synchronised
+
+    def sync(self, g: Graph):
+        """Indexes any persons and organizations that were added to the graph by other means since the last synchronisation"""
+        if self.graphsize == len(g):
+            return
+        for type in (SDO.Person, SDO.Organization):
+            for node in g.subjects(RDF.type, type):
+                if (node, type) not in self.nodes:
+                    self.add(g, node, type)
+        self.graphsize = len(g)
+
+    def add(self, g: Graph, node: Union[URIRef,BNode], type: URIRef):
+        """Adds a node to the index, nodes without any identifying properties (yet) are skipped"""
+        mail = g.value(node, SDO.email)
+        if mail:
+            self.mails[type].setdefault(normalize_identity(mail), node)
+        if type == SDO.Person:
+            firstname = g.value(node, SDO.givenName)
+            lastname = g.value(node, SDO.familyName)
+            if firstname is not None and lastname is not None:
+                self.persons.setdefault((normalize_identity(firstname), normalize_identity(lastname)), node)
+            elif not mail:
+                return
+        else:
+            name = g.value(node, SDO.name)
+            if name:
+                self.organizations.setdefault(normalize_identity(name), node)
+            elif not mail:
+                return
+        self.nodes.add((node, type))
+
+    def _verify(self, g: Graph, table: dict, key, type: URIRef, candidates) -> Optional[Union[URIRef,BNode]]:
+        node = table.get(key)
+        if node is not None and (node, RDF.type, type) not in g:
+            #node was removed from the graph, rebuild the entry from the remaining candidates that may carry the same key
+            del table[key]
+            self.nodes.discard((node, type))
+            for candidate in candidates:
+                if candidate != node and (candidate, RDF.type, type) in g:
+                    self.add(g, candidate, type)
+            return table.get(key)
+        return node
+
+    def find_person(self, g: Graph, firstname: str, lastname: str) -> Optional[Union[URIRef,BNode]]:
+        return self._verify(g, self.persons, (normalize_identity(firstname), normalize_identity(lastname)), SDO.Person, g.subjects(RDF.type, SDO.Person))
+
+    def find_organization(self, g: Graph, name: str) -> Optional[Union[URIRef,BNode]]:
+        return self._verify(g, self.organizations, normalize_identity(name), SDO.Organization, g.subjects(RDF.type, SDO.Organization))
+
+    def find_mail(self, g: Graph, mail: str, type: URIRef = SDO.Person) -> Optional[Union[URIRef,BNode]]:
+        key = normalize_identity(mail)
+        candidates = ( node for node, value in g.subject_objects(SDO.email) if normalize_identity(value) == key )
+        return self._verify(g, self.mails[type], key, type, candidates)
+
+
 def init_context(args: AttribDict):
     """Initialize the context, ensures all context JSONLDs are downloaded and local filesystem references are used instead"""
 
@@ -300,14 +499,15 @@ def init_context(args: AttribDict):
         if remote in ("http://schema.org", "https://schema.org","http://schema.org/", "https://schema.org/"):
             #schema.org does not do content negotation properly, instead it provides a link via a HEAD request, we don't support this but fake this step manually:
             remote = "https://schema.org/docs/jsonldcontext.json"
-        if not os.path.exists(localfile) or args.no_cache:
+        recording = get_cassette() is not None and get_cassette().mode == "record"
+        if not os.path.exists(localfile) or args.no_cache or recording:
             print(f"Downloading context from {remote}", file=sys.stderr)
             if remote.find("doi.org") != -1:
                 #if we use application/ld+json on doi.org URL we get metadata of the DOI resource itself rather than the jsonld it references (relevant for codemeta)
                 accept = "application/json;q=0.9,text/plain;q=0.5"
             else:
                 accept = "application/ld+json;q=1.0;application/json;q=0.9,text/plain;q=0.5"
-            r = requests.get(remote, headers={ "Accept": accept})
+            r = fetch(remote, headers={ "Accept": accept})
             r.raise_for_status()
             with open(localfile, 'wb') as f:
                 f.write(r.content)
@@ -320,12 +520,125 @@ def bind_graph(g: Graph):
     g.bind('stype', SOFTWARETYPES)
     g.bind('iodata', SOFTWAREIODATA)
 
-def init_graph(args: AttribDict):
-    """Initializes the RDF graph, the context and the prefixes"""
+def scratch_graph() -> Graph:
+    """Creates a graph for temporary use (e.g. for a single input source or a subgraph). It has no namespace bindings, as setting those up is relatively costly; use bind_like() when it is to be serialised."""
+    return Graph(bind_namespaces="none")
+
+def bind_like(g: Graph, source: Graph):
+    """Applies the namespace bindings of the source graph to the graph, prior to serialisation"""
+    for prefix, namespace in source.namespaces():
+        g.bind(prefix, namespace, override=True, replace=True)
+
+#properties for which values from another vocabulary (domain) do not override each other in composition
+COMPOSE_PER_DOMAIN = (CODEMETA.developmentStatus, SDO.applicationCategory)
+
+def overrides(p: URIRef, values: Iterable, o_old) -> Optional[Union[URIRef,BNode,Literal]]:
+    """Returns the new value (if any) that overrides an old value of a property in composition"""
+    for o in values:
+        if p in COMPOSE_PER_DOMAIN and different_domain(o,o_old):
+            #old one an new ones are URIs and have different domain, we want to keep both, do NOT override
+            continue
+        return o
+    return None
+
+class LayeredStore(Store):
+    """An rdflib store that composes the graphs of multiple sources (layers) without copying them into one, see compose().
+
+    A later layer takes precedence over what came before it: the values it provides for a property of its resource override the values earlier layers and earlier direct additions had.
+    Overrides are recorded when a layer is added, but they are resolved lazily whenever triples are read, so adding a layer costs time proportional to the new data only.
+    Triples added directly go into a base layer, removals apply to all layers (the layers are owned by the store once added)."""
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration, identifier)
+        self.base = scratch_graph() #triples that were added directly
+        self.epochs = {} #maps the triples in the base to the number of layers there were when they were added
+        self.layers = [] #(graph, resource, overrides, subjects) tuples, overrides maps properties to the new values of the layer (prior to correction), subjects is a quick filter for lookups (layers only shrink once added)
+        self.overriding = defaultdict(list) #maps (resource, property) to the indices of the layers that override it
+        self.count = 0 #number of visible triples
+
+    def _positions(self, triple) -> Iterator[int]:
+        """Yields the precedence of each occurrence of the triple, layer i has position 2i+1, base triples are positioned right after the layers that preceded them"""
+        epoch = self.epochs.get(triple)
+        if epoch is not None:
+            yield 2 * epoch
+        for i, (layer, _, _, subjects) in enumerate(self.layers):
+            if triple[0] in subjects and triple in layer:
+                yield 2 * i + 1
+
+    def _visible(self, triple) -> bool:
+        """Is the triple present in some layer without being overridden by a later one?"""
+        s, p, o = triple
+        overriding = self.overriding.get((s,p))
+        for position in self._positions(triple):
+            if not overriding or not any(2 * k + 1 > position and o not in self.layers[k][2][p] and overrides(p, self.layers[k][2][p], o) is not None for k in overriding):
+                return True
+        return False
+
+    def add_layer(self, graph: Graph, res: Union[URIRef,BNode], newvalues: dict) -> list:
+        """Adds the graph of a source as a new layer, newvalues maps the properties of the resource to the values the source provides for them. Returns the old values that are overridden as (property, old value, new value) tuples"""
+        added = sum(1 for triple in graph if not self._visible(triple))
+        overridden = []
+        for p, values in newvalues.items():
+            for (_, _, o_old), _ in self.triples((res, p, None)):
+                if o_old not in values:
+                    o = overrides(p, values, o_old)
+                    if o is not None:
+                        overridden.append((p, o_old, o))
+        self.count += added - sum(1 for p, o_old, _ in overridden if (res, p, o_old) not in graph)
+        for p in newvalues:
+            self.overriding[(res,p)].append(len(self.layers))
+        self.layers.append((graph, res, { p: set(values) for p, values in newvalues.items() }, set(graph.subjects(unique=True))))
+        return overridden
+
+    def add(self, triple, context=None, quoted=False):
+        Store.add(self, triple, context, quoted)
+        if not self._visible(triple):
+            self.base.add(triple)
+            self.epochs[triple] = len(self.layers)
+            self.count += 1
+
+    def remove(self, triple_pattern, context=None):
+        Store.remove(self, triple_pattern, context)
+        self.count -= sum(1 for _ in self.triples(triple_pattern))
+        for triple in list(self.base.triples(triple_pattern)):
+            del self.epochs[triple]
+        self.base.remove(triple_pattern)
+        for layer, _, _, _ in self.layers:
+            layer.remove(triple_pattern)
+
+    def triples(self, triple_pattern, context=None):
+        for i, source in enumerate([self.base] + [layer for layer, _, _, _ in self.layers]):
+            for triple in source.triples(triple_pattern):
+                if i > 0 and (triple in self.epochs or any(triple[0] in subjects and triple in layer for layer, _, _, subjects in self.layers[:i-1])):
+                    #already considered
+                    continue
+                if (triple[0], triple[1]) not in self.overriding or self._visible(triple):
+                    yield triple, iter(())
+
+    def __len__(self, context=None) -> int:
+        return self.count
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        self.base.store.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self.base.store.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.base.store.prefix(namespace)
+
+    def namespaces(self):
+        return self.base.store.namespaces()
+
+def init_graph(args: AttribDict, layered: bool = False):
+    """Initializes the RDF graph, the context and the prefixes. If layered is set, the graph composes its sources in layers (see LayeredStore)"""
 
     context_sources = init_context(args)
 
-    g = Graph()
+    g = Graph(store=LayeredStore()) if layered else Graph()
 
 
     #The context graph loads some additional linked data we may need for interpretation (it is not related to @context!),
@@ -371,10 +684,11 @@ def init_graph(args: AttribDict):
                 localfile = os.path.join(TMPDIR, os.path.basename(url))
             else:
                 localfile = url 
-            if not os.path.exists(localfile) and url.startswith("http"):
+            recording = get_cassette() is not None and get_cassette().mode == "record"
+            if (not os.path.exists(localfile) or recording) and url.startswith("http"):
                 print(f"Downloading data for contextgraph from {url}", file=sys.stderr)
                 accept = "application/ld+json;q=1.0;application/json;q=0.9;text/turtle;q=0.8,text/plain;q=0.5"
-                r = requests.get(url, headers={ "Accept": accept})
+                r = fetch(url, headers={ "Accept": accept})
                 r.raise_for_status()
                 with open(localfile, 'wb') as f:
                     f.write(r.content)
@@ -391,10 +705,93 @@ def init_graph(args: AttribDict):
     return g, contextgraph
 
 
+class SubstringMatcher:
+    """Finds which of a list of substrings occur in a text, in a single scan over the text (an Aho-Corasick automaton) rather than a search per substring. Substrings earlier in the list take priority."""
+    def __init__(self, substrings: Sequence[str]):
+        self.substrings = list(substrings)
+        #build a trie of all substrings, states are indices in these lists
+        self.goto = [{}]
+        self.out = [None] #for each state, the index of the first substring (by list order) that ends in this state
+        self.outall = [()] #for each state, the indices of all substrings that end in this state
+        for index, substr in enumerate(self.substrings):
+            state = 0
+            for c in substr:
+                nextstate = self.goto[state].get(c)
+                if nextstate is None:
+                    nextstate = len(self.goto)
+                    self.goto[state][c] = nextstate
+                    self.goto.append({})
+                    self.out.append(None)
+                    self.outall.append(())
+                state = nextstate
+            if self.out[state] is None:
+                self.out[state] = index
+            self.outall[state] += (index,)
+        #add failure links (breadth-first), a state inherits the output of the state it falls back to if that has priority
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nextstate in self.goto[state].items():
+                queue.append(nextstate)
+                fallback = self.fail[state]
+                while fallback and c not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nextstate] = self.goto[fallback].get(c, 0)
+                inherited = self.out[self.fail[nextstate]]
+                if inherited is not None and (self.out[nextstate] is None or inherited < self.out[nextstate]):
+                    self.out[nextstate] = inherited
+                self.outall[nextstate] += self.outall[self.fail[nextstate]]
+
+    def first(self, text: str) -> Optional[int]:
+        """Returns the index of the first substring (by list order, not by position in the text) that occurs in the text, or None"""
+        goto, fail, out = self.goto, self.fail, self.out
+        best = None
+        state = 0
+        for c in text:
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            index = out[state]
+            if index is not None and (best is None or index < best):
+                best = index
+                if best == 0:
+                    break
+        return best
+
+    def findall(self, text: str) -> set:
+        """Returns the indices of all substrings that occur in the text"""
+        goto, fail, outall = self.goto, self.fail, self.outall
+        found = set()
+        state = 0
+        for c in text:
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if outall[state]:
+                found.update(outall[state])
+        return found
+
+LICENSE_MATCHER = SubstringMatcher([ substr for substr, _ in LICENSE_MAP ])
+INTERFACE_CLUES_MATCHER = SubstringMatcher([ clue for clue, _ in INTERFACE_CLUES ])
+
+SPDX_LICENSES_FILE = os.path.join(os.path.dirname(__file__), "resources", "spdx-licenses.json")
+
+@lru_cache(maxsize=None)
+def get_spdx_licenses() -> dict:
+    """Loads the bundled SPDX license list, returns a dictionary mapping lowercased license identifiers to the proper identifiers. Deprecated identifiers are left out so they are never chosen as canonical"""
+    with open(SPDX_LICENSES_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return { license['licenseId'].lower(): license['licenseId'] for license in data['licenses'] if not license.get('isDeprecatedLicenseId') }
+
 def license_to_spdx(value: Union[str,list,tuple]) -> Union[str,list]:
     """Attempts to converts a license name or acronym to a full SPDX URI (https://spdx.org/licenses/)"""
     if isinstance(value, (list,tuple)):
         return [ license_to_spdx(x) for x in value ]
+    return _license_to_spdx(str(value))
+
+@lru_cache(maxsize=4096)
+def _license_to_spdx(value: str) -> str:
     if value in ("http://spdx.org/licenses/GPL-3.0", "https://spdx.org/licenses/GPL-3.0"):
         #short form is too inprecise and deprecated, resolve to most restrictive form:
         return "http://spdx.org/licenses/GPL-3.0-only"
@@ -413,9 +810,13 @@ def license_to_spdx(value: Union[str,list,tuple]) -> Union[str,list]:
         if value in ("GPL-3.0","GPL-2.0","AGPL-3.0","LGPL-2.1"):
             #short form is too inprecise and deprecated, resolve to most restrictive form:
             value += "-only"
-    for substr, license_uri in LICENSE_MAP:
-        if value.find(substr) != -1:
-            return license_uri
+    index = LICENSE_MATCHER.first(value)
+    if index is not None:
+        return LICENSE_MAP[index][1]
+    #no common license found, check for an exact SPDX identifier
+    license_id = get_spdx_licenses().get(value.strip().lower())
+    if license_id:
+        return "http://spdx.org/licenses/" + license_id
     return value
 
 def detect_list(value: Union[list,tuple,set,str]) -> Union[list,tuple,str]:
@@ -465,6 +866,7 @@ def add_triple(g: Graph, res: Union[URIRef, BNode],key, value, args: AttribDict,
 
     if replace or key in ( x.split("/")[-1] for x in SINGULAR_PROPERTIES  ):
         f_add = g.set
+        touch_graph(g) #replacing a value leaves the size of the graph unchanged
     else:
         f_add = g.add
     if key == "developmentStatus":
@@ -581,11 +983,11 @@ def add_authors(g: Graph, res: Union[URIRef, BNode], value, property=SDO.author,
 
         author = URIRef(generate_uri(firstname + "-" + lastname, kwargs.get('baseuri'), prefix="person"))
         if skip_duplicates:
-            q = f"SELECT ?a WHERE {{ ?a a schema:Person . ?a schema:givenName \"{firstname}\" . ?a schema:familyName \"{lastname}\" . }}"
-            if g.query(q, initNs={'schema': SDO }):
+            identities = get_graph_index(g).identities(g)
+            if identities.find_person(g, firstname, lastname):
                 #person already exists, skipping
                 continue
-            if mail and g.query(f"SELECT ?a WHERE {{ ?a a schema:Person . ?a schema:email \"{mail}\" . }}", initNs={ 'schema': SDO }):
+            if mail and identities.find_mail(g, mail):
                 #mail already exists, skipping
                 continue
 
@@ -608,12 +1010,19 @@ def add_authors(g: Graph, res: Union[URIRef, BNode], value, property=SDO.author,
             add_to_ordered_list(g, res, property, author)
         else:
             g.add((res, property, author))
+
+        if skip_duplicates:
+            #the index was in sync before we added this author, update it incrementally
+            identities.add(g, author, SDO.Person)
+            if org:
+                identities.add(g, orgres, SDO.Organization)
+            identities.graphsize = len(g)
         authors.append(author) #return the nodes
 
     return authors
 
 def add_to_ordered_list(g: Graph, subject: Union[URIRef, BNode], property: URIRef, object: Union[URIRef, BNode, Literal], identifying_properties: list = [SDO.name,SDO.email]):
-    """Add an item to the end of an ordered list in RDF (rdf:first, rdf:next)"""
+    """Add an item to the end of an ordered list in RDF (rdf:first, rdf:next). The tail and members of the list are indexed so this takes constant time."""
     collection = g.value(subject, property)
 
     #make an invetory of property that might identify the object, so we don't add it twice
@@ -624,35 +1033,28 @@ def add_to_ordered_list(g: Graph, subject: Union[URIRef, BNode], property: URIRe
             if v:
                 idpropmap[prop] = v
 
+    orderedlists = get_graph_index(g).orderedlists
     if collection and isinstance(collection, (URIRef,BNode)) and (collection, RDF.first,None) in g:
-        while True:
-            if (collection, RDF.first, object) in g:
-                #item already exists, nothing to add
-                return False
-            testobject = g.value(collection, RDF.first)
-            if isinstance(testobject, (URIRef, BNode)):
-                for prop, value in idpropmap.items():
-                    v = g.value(testobject,prop)
-                    if v and v == value:
-                        #item already exists, nothing to add
-                        return False
-            end = g.value(collection, RDF.rest)
-            if end == RDF.nil or not end:
-                break
-            collection = end
-        if not end:
-            raise Exception(f"Unable to find end of ordered list {collection}")
-        g.remove((collection, RDF.rest, RDF.nil))
+        index = orderedlists.get((subject, property))
+        if index is None or not index.valid(g, collection):
+            index = orderedlists[(subject, property)] = OrderedListIndex.build(g, collection)
+        if index.contains(g, object, idpropmap):
+            #item already exists, nothing to add
+            return False
+        g.remove((index.tail, RDF.rest, RDF.nil))
         newnode = BNode()
         g.add((newnode, RDF.first, object)) 
         g.add((newnode, RDF.rest, RDF.nil)) 
-        g.add((collection, RDF.rest, newnode))
+        g.add((index.tail, RDF.rest, newnode))
+        index.append(newnode, object)
         return True
     elif not collection:
         collection = BNode()
         g.add((subject,property, collection))
         g.add((collection, RDF.first, object))
         g.add((collection, RDF.rest, RDF.nil))
+        index = orderedlists[(subject, property)] = OrderedListIndex(collection)
+        index.append(collection, object)
         return True
     return False
 
@@ -729,22 +1131,22 @@ def split_comma_rfc822(s):
 
 def reconcile(g: Graph, res: URIRef, args: AttribDict):
     """Reconcile possible conflicts in the graph and issue warnings."""
-    IDENTIFIER = g.value(res, SDO.identifier)
-    if not IDENTIFIER: IDENTIFIER = str(res)
-    HEAD = f"[CODEMETA VALIDATION ({IDENTIFIER})]"
+    view = get_resource_view(g, res)
+    HEAD = f"[CODEMETA VALIDATION ({view.identifier})]"
 
-    if (res, SDO.codeRepository, None) not in g:
+    if SDO.codeRepository not in view:
         print(f"{HEAD} codeRepository not set",file=sys.stderr)
-    if (res, SDO.author, None) not in g:
+    if SDO.author not in view:
         print(f"{HEAD} author not set",file=sys.stderr)
-    if (res, SDO.license, None) not in g:
+    if SDO.license not in view:
         print(f"{HEAD} license not set",file=sys.stderr)
 
     #rewrite technology readiness level to developmentStatus
-    for s,p,o in g.triples((res, TRL.technologyReadinessLevel, None)):
+    for o in view.objects(TRL.technologyReadinessLevel):
         if str(o).startswith(TRL):
-            g.remove((s,p,o))
-            g.add((s,CODEMETA.developmentStatus,o))
+            g.remove((res,TRL.technologyReadinessLevel,o))
+            g.add((res,CODEMETA.developmentStatus,o))
+            touch_graph(g)
 
 
     if (res, SDO.license, URIRef("http://spdx.org/licenses/GPL-3.0-only")) in g and (res, SDO.license, URIRef("http://spdx.org/licenses/GPL-2.0-or-later")) in g:
@@ -756,10 +1158,10 @@ def reconcile(g: Graph, res: URIRef, args: AttribDict):
 
 
     #if there are multiple target applications of the same type, delete any 'stub' ones that have no url, as these stub ones were created by codemetapy based on interface type and carry the same name as the SoftwareSourceCode resource. The stub entries are generated by guess_interfacetype(), called by enrich()
-    name = g.value(res,SDO.name)
+    name = view.value(SDO.name)
     if name:
         targetapplications = set()
-        for prop in CODEMETA.isSourceCodeOf:
+        for prop in (CODEMETA.isSourceCodeOf,):
             for _,_,targetapplication in g.triples((res, prop, None)):
                 if isinstance(targetapplication, (URIRef, BNode)):
                     for _,_,t in g.triples((targetapplication,RDF.type,None)):
@@ -785,27 +1187,65 @@ def reconcile(g: Graph, res: URIRef, args: AttribDict):
     print(f"{HEAD} done",file=sys.stderr)
 
 
-def enrich(g: Graph, res: URIRef, args: AttribDict):
-    """Do some automatic inference and enrichment of the graph"""
-    IDENTIFIER = g.value(res, SDO.identifier)
-    if not IDENTIFIER: IDENTIFIER = str(res)
-    HEAD = f"[CODEMETA ENRICHMENT ({IDENTIFIER})]"
-
-    if g and (res, CODEMETA.isSourceCodeOf, None) not in g:
+class EnrichmentIndex:
+    """Precomputed lookup tables over an entire graph, shared by enrich() when it processes many resources in one go (see process_resources()).
+    Only holds information on related nodes (persons, organizations, dependencies) that enriching a resource does not change. Properties of the resource itself are looked up via its ResourceView."""
+    def __init__(self, g: Graph):
+        self.types = defaultdict(set) #Person and Organization nodes -> types
+        for t in (SDO.Person, SDO.Organization):
+            for node in g.subjects(RDF.type, t):
+                self.types[node].add(t)
+        self.affiliations = defaultdict(list)
+        for s, o in g.subject_objects(SDO.affiliation):
+            self.affiliations[s].append(o)
+        self.mails = {}
+        for s in g.subjects(SDO.email, unique=True):
+            self.mails[s] = g.value(s, SDO.email)
+        #resource -> names of dependencies, dependencies are often shared so we look up their names only once
+        names = {}
+        self.dependencynames = defaultdict(list)
+        for s, o in g.subject_objects(SDO.softwareRequirements):
+            if o not in names:
+                names[o] = g.value(o, SDO.name)
+            self.dependencynames[s].append(names[o])
+
+    def is_a(self, node, type: URIRef) -> bool:
+        return type in self.types.get(node, ())
+
+
+def process_resources(g: Graph, resources: Iterable[Union[URIRef,BNode]], args: AttribDict, do_enrich: bool = False):
+    """Runs the automatic corrections, reconciliation and (optionally) enrichment on many resources in one pass.
+    The lookup tables needed for enrichment are computed only once for the whole graph."""
+    index = EnrichmentIndex(g) if do_enrich else None
+    for res in resources:
+        correct(g, res, args)
+        reconcile(g, res, args)
+        if index is not None:
+            enrich(g, res, args, index) #type: ignore
+
+def enrich(g: Graph, res: URIRef, args: AttribDict, index: Optional[EnrichmentIndex] = None):
+    """Do some automatic inference and enrichment of the graph. Pass an EnrichmentIndex when enriching many resources."""
+    view = get_resource_view(g, res)
+    HEAD = f"[CODEMETA ENRICHMENT ({view.identifier})]"
+
+    if g and CODEMETA.isSourceCodeOf not in view:
         #we have no target products, that means we have no associated interface types,
         #see if we can extract some clues from the keywords or the description
         #and add a targetproduct (with only a type)
-        guess_interfacetype(g,res, args)
+        guess_interfacetype(g,res, args, index.dependencynames.get(res, []) if index else None)
+
+    runtimeplatforms = view.objects(SDO.runtimePlatform)
+    programminglanguages = view.objects(SDO.programmingLanguage)
 
-    if not g.value(res, SDO.programmingLanguage):
-        for _,_,o in g.triples((res, SDO.runtimePlatform,None)):
+    if not programminglanguages:
+        for o in runtimeplatforms:
             for platform in ("Python","Perl","Ruby","Julia","PHP"): #java is not added because the JVM does not necessarily mean things are written in java, NodeJS is not added because it can mean either Javascript or Typescript
                 if str(o).lower().startswith(platform.lower()):
                     lang = platform
                     print(f"{HEAD} automatically adding programmingLanguage {lang} derived from runtimePlatform {platform}",file=sys.stderr)
-                    g.add((res, SDO.programmingLanguage, Literal(lang)))
-    elif not g.value(res, SDO.runtimePlatform):
-        for _,_,o in g.triples((res, SDO.programmingLanguage,None)):
+                    g.add((res, SDO.programmingLanguage, intern_literal(lang)))
+    elif not runtimeplatforms:
+        for o in programminglanguages:
             #                                                      v--- space is needed to prevent mismatches with Javascript
             for lang in ("Python","Perl","Ruby","Julia","PHP","Java ","Kotlin","Groovy","Erlang","Elixir"):
                 if str(o).lower() == lang.lower().strip() or str(o).lower().startswith(lang.lower()):
@@ -816,27 +1256,27 @@ def enrich(g: Graph, res: URIRef, args: AttribDict):
                     else:
                         platform = lang
                     print(f"{HEAD} automatically adding runtimePlatform {platform} derived from programmingLanguage {lang}",file=sys.stderr)
-                    g.add((res, SDO.runtimePlatform, Literal(platform)))
+                    g.add((res, SDO.runtimePlatform, intern_literal(platform)))
 
-    if not g.value(res, SDO.contributor) and (res, SDO.author,None) in g:
+    if not view.value(SDO.contributor) and SDO.author in view:
         for _,_,o in iter_ordered_list(g, res, SDO.author):
             print(f"{HEAD} adding author {o} as contributor",file=sys.stderr)
             add_to_ordered_list(g, res, SDO.contributor, o)
-    elif not g.value(res, SDO.author) and (res, SDO.contributor,None) in g:
+    elif not view.value(SDO.author) and SDO.contributor in view:
         for _,_,o in iter_ordered_list(g, res, SDO.author):
             print(f"{HEAD} adding contributor {o} as author",file=sys.stderr)
             add_to_ordered_list(g, res, SDO.author, o)
 
-    if not g.value(res, SDO.maintainer) and (res, SDO.author,None) in g:
+    if not view.value(SDO.maintainer) and SDO.author in view:
         print(f"{HEAD} considering first author as maintainer",file=sys.stderr)
         for _,_,o in iter_ordered_list(g, res, SDO.author):
-            mail = g.value(o,SDO.email)
+            mail = index.mails.get(o) if index else g.value(o,SDO.email)
             if mail is None or (mail is not None and str(mail).lower().find("unknown") == -1 and str(mail).lower().find("noreply") == -1 and str(mail).lower().find("no-reply") == -1): #filters out maintainers with invalid e-mail addresses (does retain maintainers without mail address at all)
                 g.add((res, SDO.maintainer, o))
             break
 
     maintainers = list(g.triples((res, SDO.maintainer,None)))
-    if not g.value(res, SDO.producer) and maintainers:
+    if not view.value(SDO.producer) and maintainers:
         for maintainer in maintainers:
             if isinstance(maintainer, (URIRef,BNode)):
                 if (maintainer, RDF.type, SDO.Person) in g:
@@ -847,78 +1287,105 @@ def enrich(g: Graph, res: URIRef, args: AttribDict):
                     print(f"{HEAD} maintainer is organization, add as producer",file=sys.stderr)
                     g.add((res, SDO.producer, maintainer))
 
-    if not g.value(res, SDO.producer) and (res, SDO.author,None) in g:
+    if not view.value(SDO.producer) and SDO.author in view:
         for _,_,author in iter_ordered_list(g, res, SDO.author):
             if isinstance(author, (URIRef,BNode)):
-                if (author, RDF.type, SDO.Person) in g:
-                    for _,_,o in g.triples((author, SDO.affiliation,None)):
+                if index.is_a(author, SDO.Person) if index else (author, RDF.type, SDO.Person) in g:
+                    for o in (index.affiliations.get(author, []) if index else g.objects(author, SDO.affiliation)):
                         print(f"{HEAD} adding affiliation(s) of first author as producer",file=sys.stderr)
                         g.add((res, SDO.producer, o))
-                elif (author, RDF.type, SDO.Organization) in g:
+                elif index.is_a(author, SDO.Organization) if index else (author, RDF.type, SDO.Organization) in g:
                     print(f"{HEAD} author is organization, add as producer",file=sys.stderr)
                     g.add((res, SDO.producer, author))
             break
 
 
-def guess_interfacetype(g: Graph, res: Union[URIRef,BNode], args: AttribDict) -> Union[URIRef,None]:
-    IDENTIFIER = g.value(res, SDO.identifier)
-    if not IDENTIFIER: IDENTIFIER = str(res)
-    HEAD = f"[CODEMETA ENRICHMENT ({IDENTIFIER})]"
-
-    counter = Counter() #we count clues for all kinds of types we can find and pick the highest one
-    keywords = [ o.lower() for _,_,o in g.triples((res, SDO.keywords, None)) ]
-    for clue, interfacetype in INTERFACE_CLUES:
-        for keyword in keywords:
-            if keyword.find(clue) != -1:
-                counter.update({interfacetype:1})
-    description = g.value(res, SDO.description)
+def interface_clues(texts: Iterable[str]) -> Counter:
+    """Counts, for each interface type, the clues (INTERFACE_CLUES) in the texts (e.g. keywords or a description). Each text is scanned only once."""
+    counter = Counter()
+    for text in texts:
+        for index in INTERFACE_CLUES_MATCHER.findall(str(text).lower()):
+            counter[INTERFACE_CLUES[index][1]] += 1
+    return counter
+
+def dependency_clues(names: Iterable[Optional[str]]) -> Counter:
+    """Counts, for each interface type, the dependencies (by name) that are indicative of it (INTERFACE_CLUES_DEPS)"""
+    counter = Counter()
+    for name in names:
+        if name:
+            interfacetype = INTERFACE_CLUES_DEPS.get(str(name).lower())
+            if interfacetype:
+                counter[interfacetype] += 1
+    return counter
+
+def guess_interfacetype(g: Graph, res: Union[URIRef,BNode], args: AttribDict, dependencynames: Optional[Iterable] = None) -> Union[URIRef,None]:
+    view = get_resource_view(g, res)
+    HEAD = f"[CODEMETA ENRICHMENT ({view.identifier})]"
+
+    #we count clues for all kinds of types we can find and pick the highest one
+    texts = list(view.objects(SDO.keywords))
+    description = view.value(SDO.description)
     if description:
-        description = description.lower()
-        for clue, interfacetype in INTERFACE_CLUES:
-            if description.find(clue) != -1:
-                counter.update({interfacetype:1})
+        texts.append(description)
+    counter = interface_clues(texts)
     #can we infer a type from the dependencies?
-    for _,_, depres in g.triples((res,SDO.softwareRequirements,None)):
-        depname = g.value(depres,SDO.name)
-        if depname:
-            depname = depname.lower()
-            if depname in INTERFACE_CLUES_DEPS:
-                counter.update({INTERFACE_CLUES_DEPS[depname]:1})
+    if dependencynames is None:
+        dependencynames = [ g.value(depres,SDO.name) for depres in view.objects(SDO.softwareRequirements) ]
+    counter.update(dependency_clues(dependencynames))
 
     if counter:
         interfacetype = max(counter)
         print(f"{HEAD} Guessing interface type {interfacetype} based on clues",file=sys.stderr)
         targetres = URIRef(generate_uri(baseuri=args.baseuri, prefix="stub"))
         g.set((targetres, RDF.type, interfacetype))
-        name = g.value(res,SDO.name)
+        name = view.value(SDO.name)
         if name:
             g.set((targetres, SDO.name, name))
         g.set((res, CODEMETA.isSourceCodeOf, targetres))
         return targetres
 
 
+def iter_reachable(g: Graph, reslist: Sequence[Union[URIRef,BNode]], history: Optional[set] = None) -> Generator:
+    """Iterates breadth-first over the specified resources and everything that is (transitively) referenced from them. Yields each node only once (no recursion is involved). Nodes in history will not be visited."""
+    seen = set(reslist)
+    if history:
+        seen |= history
+    checked = set() #literals we already tested for being a possible reference
+    queue = deque(reslist)
+    while queue:
+        res = queue.popleft()
+        yield res
+        for pred, obj in g.predicate_objects(res):
+            if isinstance(obj, (URIRef, BNode)):
+                if obj not in seen:
+                    seen.add(obj)
+                    queue.append(obj)
+            elif isinstance(obj, Literal) \
+                and pred not in PREFER_LITERAL_PROPERTIES_SET \
+                and obj not in checked \
+                and str(obj).startswith(("http","_","/")):
+                #include with things that are likely references but ended up as a Literal by mistake
+                checked.add(obj)
+                ref = URIRef(obj)
+                if ref not in seen and (ref,None,None) in g:
+                    seen.add(ref)
+                    queue.append(ref)
+
+
+def iter_subgraph(g: Graph, reslist: Sequence[Union[URIRef,BNode]], history: Optional[set] = None) -> Generator:
+    """Yields all triples of the specified resources and of everything that is (transitively) referenced from them, without materialising a new graph"""
+    for res in iter_reachable(g, reslist, history):
+        for pred, obj in g.predicate_objects(res):
+            yield res, pred, obj
+
+
 def get_subgraph(g: Graph, reslist: Sequence[Union[URIRef,BNode]], subgraph: Union[Graph,None] = None, history: Optional[set] = None ) -> Graph:
-    """Add everything referenced from the specified resource to the new subgraph"""
+    """Add everything referenced from the specified resource to the new subgraph. A new subgraph has no namespace bindings (see bind_like())"""
 
     if subgraph is None:
-        subgraph = Graph()
-        bind_graph(subgraph)
-
-    if history is None:
-        history = set()
+        subgraph = scratch_graph()
 
-    for res in reslist:
-        for pred, obj in g[res]:
-            if isinstance(obj, (URIRef, BNode)) and obj not in history:
-                history.add(obj)
-                get_subgraph(g, [obj], subgraph, history)
-            elif isinstance(obj, Literal) \
-                and str(obj).startswith(("http","_","/")) \
-                and (URIRef(obj),None,None) in g \
-                and pred not in PREFER_LITERAL_PROPERTIES \
-                and URIRef(obj) not in history: #include with things that are likely references but ended up as a Literal by mistake
-                history.add(URIRef(obj))
-                get_subgraph(g, [URIRef(obj)], subgraph, history)
+    subgraph.addN((s, p, o, subgraph) for s, p, o in iter_subgraph(g, reslist, history))
 
     return subgraph
 
@@ -933,43 +1400,67 @@ def getstream(source: str):
 def remap_uri(g: Graph, from_uri, to_uri):
     """Changes URIs (in-graph)"""
     assert from_uri is not None and to_uri is not None
-    if not isinstance(from_uri, URIRef):
-        from_uri = URIRef(from_uri)
-    if not isinstance(to_uri, URIRef):
-        to_uri = URIRef(to_uri)
-    for s,p,o in g.triples((from_uri,None,None)):
-        g.remove((s,p,o))
-        g.add((to_uri,p,o)) #type: ignore
-    for s,p,o in g.triples((None,None,from_uri)):
-        g.remove((s,p,o))
-        g.add((s,p,to_uri)) #type: ignore
+    remap_uris(g, {from_uri: to_uri})
+
+def remap_uris(g: Graph, mapping: dict):
+    """Changes multiple URIs (in-graph) in one pass. The mapping maps old URIs to new URIs, mappings are not applied transitively."""
+    mapping = { URIRef(from_uri) if not isinstance(from_uri, URIRef) else from_uri: URIRef(to_uri) if not isinstance(to_uri, URIRef) else to_uri
+                for from_uri, to_uri in mapping.items() if from_uri != to_uri }
+    if not mapping:
+        return
+    #collect all affected triples first, so we don't modify the graph whilst iterating over it
+    affected = set()
+    for from_uri in mapping:
+        affected.update(g.triples((from_uri,None,None)))
+        affected.update(g.triples((None,None,from_uri)))
+    for triple in affected:
+        g.remove(triple)
+    g.addN( (mapping.get(s,s), p, mapping.get(o,o), g) for s,p,o in affected ) #type: ignore
+    index = get_graph_index(g)
+    for from_uri in mapping:
+        index.views.pop(from_uri, None)
+    index.forge_users = { key: mapping.get(node, node) for key, node in index.forge_users.items() }
+    #the members of ordered lists may have been renamed
+    index.orderedlists.clear()
+    touch_graph(g)
 
 
 def compose(g: Graph, newgraph: Graph, res: URIRef, args: AttribDict):
-    """Merges two graphs that cover the same resource (= metadata composition). Later properties will overwrite earlier ones. Newgraph will be merged into g at the end of this process."""
-   
-    IDENTIFIER = g.value(res, SDO.identifier) or newgraph.value(res, SDO.identifier)
+    """Merges two graphs that cover the same resource (= metadata composition). Later properties will overwrite earlier ones. Newgraph will be merged into g at the end of this process.
+    If g has a LayeredStore (as build() uses), newgraph is not copied but becomes a layer of g, and the overrides are resolved when g is read."""
+
+    IDENTIFIER = get_resource_view(g, res).value(SDO.identifier) or newgraph.value(res, SDO.identifier)
     if not IDENTIFIER: IDENTIFIER = str(res)
     HEAD = f"[CODEMETA COMPOSITION ({IDENTIFIER})]"
 
     #Later properties always override earlier properties (they are overwritten and not merged!)
-    for s,p,o in newgraph.triples((res,None,None)):
-        if (s,p,None) in g:
-            for s,p,o_old in g.triples((res,p,None)):
-                if (s,p,o_old) not in newgraph:
-                    if p in (CODEMETA.developmentStatus, SDO.applicationCategory):
-                        #this is a bit simplistic for now...
-                        if different_domain(o,o_old):
-                            #old one an new ones are URIs and have different domain, we want to keep both, do NOT override
-                            continue
+    #group the new values per property first, so the old values of each property are considered only once
+    newvalues = defaultdict(list)
+    for p, o in newgraph.predicate_objects(res):
+        newvalues[p].append(o)
+
+    if isinstance(g.store, LayeredStore):
+        #some correcting operations on the newgraph
+        correct(newgraph, res, args)
+        #the new graph becomes a layer of the main graph, overrides are resolved lazily
+        for p, o_old, o in g.store.add_layer(newgraph, res, newvalues):
+            print(f"{HEAD} overriding old {p} ({o_old} -> {o})",file=sys.stderr)
+    else:
+        for p, values in newvalues.items():
+            for o_old in list(g.objects(res, p)):
+                if (res,p,o_old) in newgraph:
+                    continue
+                o = overrides(p, values, o_old)
+                if o is not None:
                     print(f"{HEAD} overriding old {p} ({o_old} -> {o})",file=sys.stderr)
-                    g.remove((s,p,o_old))
+                    g.remove((res,p,o_old))
 
-    #some correcting operations on the newgraph
-    correct(newgraph, res, args)
+        #some correcting operations on the newgraph
+        correct(newgraph, res, args)
 
-    #there must be NO blank nodes anymore at this point!!! They might collide
-    g += newgraph
+        #there must be NO blank nodes anymore at this point!!! They might collide
+        g += newgraph
+    touch_graph(g)
     print(f"{HEAD} processed {len(newgraph)} new triples, total is now {len(g)}",file=sys.stderr) #type: ignore
 
 def different_domain(res: URIRef, res2: URIRef) -> bool:
@@ -982,23 +1473,25 @@ def different_domain(res: URIRef, res2: URIRef) -> bool:
 def correct(g:Graph, res: Union[URIRef,BNode], args: AttribDict):
     """Runs several automatic correction operations on the graph"""
 
-    IDENTIFIER = g.value(res, SDO.identifier)
-    if not IDENTIFIER: IDENTIFIER = str(res)
-    HEAD = f"[CODEMETA CORRECTION ({IDENTIFIER})]"
+    view = get_resource_view(g, res)
+    HEAD = f"[CODEMETA CORRECTION ({view.identifier})]"
 
     #when developmentStatus is a repostatus id, convert it to the full URI
-    for _,_,status in g.triples((res, CODEMETA.developmentStatus,None)):
+    for status in view.objects(CODEMETA.developmentStatus):
         if str(status).lower() in REPOSTATUS_MAP.values():
             print(f"{HEAD} automatically converting status {status} to repostatus URI",file=sys.stderr)
             g.remove((res, CODEMETA.developmentStatus, status))
             g.set((res, CODEMETA.developmentStatus, URIRef("https://www.repostatus.org/#" + str(status).lower())))
+            touch_graph(g)
 
     #attempt to convert licenses to a full spdx.org URI
-    for _,_,license in g.triples((res, SDO.license,None)):
+    remappings = {}
+    for license in view.objects(SDO.license):
         if str(license).upper() in ("UNKNOWN", "NOASSERTION","NONE"):
             g.remove((res, SDO.license, Literal(license)))
         elif license and isinstance(license, Literal) and not str(license).startswith("http"):
             g.remove((res, SDO.license,license))
+            touch_graph(g)
             license = license_to_spdx(license)
             if str(license).startswith("http"):
                 print(f"{HEAD} automatically converting license to spdx URI",file=sys.stderr)
@@ -1008,7 +1501,8 @@ def correct(g:Graph, res: Union[URIRef,BNode], args: AttribDict):
         elif isinstance(license, (Literal,URIRef)) and str(license).startswith("https://spdx.org"):
             #map to HTTP
             print(f"{HEAD} automatically converting spdx license URI from https:// to http:///",file=sys.stderr)
-            remap_uri(g, license, URIRef(str(license).replace("https://","http://")))
+            remappings[license] = URIRef(str(license).replace("https://","http://"))
+    remap_uris(g, remappings)
 
 def get_doi(g: Graph, res: Union[URIRef,BNode]) -> Optional[str]:
     """Get the DOI for a resource, looks in various places"""
@@ -1,9 +1,15 @@
 import sys
+import os.path
+import json
+import re
 import requests
 import time
+import threading
 from os import environ
 from datetime import datetime
-from typing import Union, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Union, Optional, Tuple, Iterable, Iterator
+from urllib.parse import urlparse
 from rdflib import Graph, URIRef, BNode, Literal
 from rdflib.namespace import RDF #type: ignore
 from codemeta.common import (
@@ -15,7 +21,9 @@ from codemeta.common import (
     parse_human_name,
     generate_uri,
     delete_repostatus,
+    get_graph_index,
 )
+from codemeta.remote import cached_get, fetch as fetch_url, get_cassette, RATELIMITER, RateLimitExceeded, CACHEDIR, makedirs_private, open_private
 
 GITAPI_REPO_BLACKLIST = [
     "https://codeberg.org/",
@@ -26,64 +34,434 @@ GITAPI_REPO_BLACKLIST = [
 # it shall be persistent because each new yaml a new invoke of codemetapy is performed and so memory reset
 repo_type_cache = {}
 
+# hosts of well-known forges and their kind (None for forges without a supported API), these are never probed
+KNOWN_FORGES = {
+    "github.com": "github",
+    "www.github.com": "github",
+    "gitlab.com": "gitlab",
+    "salsa.debian.org": "gitlab",
+    "gitlab.gnome.org": "gitlab",
+    "gitlab.freedesktop.org": "gitlab",
+    "invent.kde.org": "gitlab",
+    "framagit.org": "gitlab",
+    "codeberg.org": None,
+    "git.sr.ht": None,
+    "bitbucket.org": None,
+    "bitbucket.com": None,
+}
+
+# results of probing other hosts are persisted in this file, and are trusted for FORGE_CACHE_TTL seconds
+FORGE_CACHE = os.path.join(CACHEDIR, "forges.json")
+FORGE_CACHE_TTL = int(environ.get("CODEMETAPY_FORGE_CACHE_TTL", 30 * 24 * 3600))
+forge_cache_lock = threading.Lock()
+
+# timeout (in seconds) when probing an unknown host
+PROBE_TIMEOUT = float(environ.get("CODEMETAPY_PROBE_TIMEOUT", 5))
+
+# base URL of the GitHub API, may be overridden (e.g. to point at a local stub server for testing)
+GITHUB_API = environ.get("CODEMETAPY_GITHUB_API", "https://api.github.com").rstrip("/")
+
+# user and organization lookups are shared by all repositories (an organization may own hundreds of them),
+# maps (API host, user id or login) to a Future holding the API response
+user_cache = {}
+user_cache_lock = threading.Lock()
+
+# how long (in seconds) looked up users and organizations are reused from the on-disk cache before they are revalidated
+USER_CACHE_TTL = int(environ.get("CODEMETAPY_USER_CACHE_TTL", 7 * 24 * 3600))
+
 
 def _parse_source(source: str) -> Tuple[str, str, str]:
     source = source.strip("/")
     cleaned_url = source
     scheme = ""
-    if source.startswith("https://"):
-        host = cleaned_url.replace("https://", "").split("/")[0]
-        scheme = "https://"
+    if source.startswith(("https://", "http://")):
+        scheme = source[: source.index("://") + 3]
+        host = cleaned_url[len(scheme) :].split("/")[0]
     else:
         raise ValueError(source + " source url format not recognized!!")
     return cleaned_url, scheme, host
 
 
+def normalize_source(source: str) -> str:
+    """Normalizes the URL of a git repository, e.g. transforms git@gitlab.com:X into https://gitlab.com/X"""
+    source = re.sub(r"git@(.*):", r"https://\1/", source)
+    if source.endswith(".git"):
+        source = source[:-4]
+    return source
+
+
+def parse_forges(specification: Union[str, Iterable[str]]) -> dict:
+    """Parses a mapping of hosts to forge kinds, specified as host=kind pairs (a list, or a comma separated string).
+    The kind is github, gitlab, or none for hosts that have no supported API."""
+    if isinstance(specification, str):
+        specification = specification.split(",")
+    forges = {}
+    for pair in specification:
+        if pair.strip():
+            host, _, kind = pair.strip().partition("=")
+            kind = kind.strip().lower()
+            if kind not in ("github", "gitlab", "none", ""):
+                raise ValueError(f"Invalid forge kind for {host}: {kind}")
+            forges[host.strip().lower()] = kind if kind in ("github", "gitlab") else None
+    return forges
+
+
+# hosts whose kind is known in advance, may be extended via CODEMETAPY_FORGES or --forge
+FORGES = dict(KNOWN_FORGES)
+FORGES.update(parse_forges(environ.get("CODEMETAPY_FORGES", "")))
+
+
+def _load_forge_cache() -> dict:
+    try:
+        with open(FORGE_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_forge_kind(hostkey: str, repo_kind: Optional[str]):
+    """Persists the kind of a host in the forge cache, this is best-effort: failures are reported but not raised"""
+    with forge_cache_lock:
+        forgecache = _load_forge_cache()
+        forgecache[hostkey] = {"kind": repo_kind, "date": time.time()}
+        # write to a temporary file first and move it into place, so concurrent readers never see a partial file
+        tmpfile = f"{FORGE_CACHE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            makedirs_private(os.path.dirname(FORGE_CACHE))
+            with open_private(tmpfile) as f:
+                json.dump(forgecache, f)
+            os.replace(tmpfile, FORGE_CACHE)
+        except OSError as e:
+            print(f"Unable to store the forge kind of {hostkey} in {FORGE_CACHE}: {e}", file=sys.stderr)
+
+
+def probe_repo_kind(scheme: str, host: str) -> Tuple[Optional[str], bool]:
+    """Tests whether a host is a GitLab instance. Returns the repo kind, and whether the outcome is conclusive (it is not when the host could not be reached)"""
+    test_url = f"{scheme}{host}/-/manifest.json"  # this seems a relatively cheap way to test if it's a gitlab instance
+    try:
+        response = fetch_url(test_url, timeout=PROBE_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"Unable to probe {scheme}{host} for a git API: {e}", file=sys.stderr)
+        return None, False
+    if response.status_code == 200 and response.headers.get(
+        "Content-Type", ""
+    ).startswith("application/json"):
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if isinstance(data, dict) and data.get("short_name") == "GitLab":
+            return "gitlab", True
+    return None, response.status_code < 500
+
+
 def get_repo_kind(source: str) -> Optional[str]:
+    """Determines the kind of git API the host of the source offers (github, gitlab or None). Known hosts are looked up,
+    others are probed once and the outcome is remembered (also on disk, for FORGE_CACHE_TTL seconds)"""
     source, scheme, host = _parse_source(source)
+    hostkey = f"{scheme}{host}/"
+
+    if host.lower() in FORGES:
+        return FORGES[host.lower()]
+    if hostkey in GITAPI_REPO_BLACKLIST:
+        return None
+    if hostkey in repo_type_cache:
+        return repo_type_cache[hostkey]
+
+    # we have another URL that may or may not be a private gitlab instance
+    entry = _load_forge_cache().get(hostkey) if get_cassette() is None else None
+    if entry and time.time() - entry["date"] < FORGE_CACHE_TTL:
+        repo_kind = entry["kind"]
+    else:
+        repo_kind, conclusive = probe_repo_kind(scheme, host)
+        # persist the outcome even when there is a 4xx failure, but not when the host was unreachable
+        if conclusive:
+            _store_forge_kind(hostkey, repo_kind)
 
-    repo_kind = None
-    if "github.com/" in source:
-        repo_kind = "github"
-    elif "gitlab.com/" in source:
-        repo_kind = "gitlab"
-    elif f"{scheme}{host}/" not in GITAPI_REPO_BLACKLIST:
-        # we have another URL that may or may not be a private gitlab instance, test
-        if f"{scheme}{host}/" in repo_type_cache:
-            repo_kind = repo_type_cache[f"{scheme}{host}/"]
-        else:
-            test_url = f"{scheme}{host}/-/manifest.json"  # this seems a relatively cheap way to test if it's a gitlab instance
-            response = requests.get(test_url)
-            if response.status_code == 200 and response.headers[
-                "Content-Type"
-            ].startswith("application/json"):
-                response = response.json()
-                if response["short_name"] == "GitLab":
-                    repo_kind = "gitlab"
-
-    # Populate the cache even when there is a 4xx failure
-    repo_type_cache[f"{scheme}{host}/"] = repo_kind
+    repo_type_cache[hostkey] = repo_kind
 
     return repo_kind
 
 
+def fetch(source: str, repo_kind: str, args: AttribDict) -> dict:
+    """Queries the API for the repository and for everything else the parser needs (e.g. the owner), without touching
+    any graph. Returns a dictionary of API responses."""
+    source, scheme, host = _parse_source(source)
+    use_cache = not args.no_cache
+    suffix = source.replace(scheme + host, "")[1:]
+
+    responses = {}
+    if repo_kind == "github":
+        repository = responses["repository"] = rate_limit_get(
+            f"{GITHUB_API}/repos/{suffix}", "github", use_cache=use_cache
+        )
+        if repository.get("archived", False):
+            reponame = repository.get("full_name")  # namespace/repo
+            responses["releases"] = rate_limit_get(
+                f"{GITHUB_API}/repos/{reponame}/releases", "github", use_cache=use_cache
+            )
+        if "owner" in repository:
+            owner = repository["owner"]["login"]
+            responses["owner"] = get_user(
+                f"{GITHUB_API}/users/{owner}", owner, "github", use_cache=use_cache
+            )
+    elif repo_kind == "gitlab":
+        users_api_url = f"{scheme}{host}/api/v4/users/"
+        gitlab_suffix = suffix.replace("/", "%2F")
+        repository = responses["repository"] = rate_limit_get(
+            f"{scheme}{host}/api/v4/projects/{gitlab_suffix}",
+            "gitlab",
+            use_cache=use_cache,
+        )
+        # https://docs.gitlab.com/ee/api/users.html
+        # namespace kind can be just group or user
+        owner_id_str = ""
+        if "namespace" in repository and repository["namespace"]["kind"] == "user":
+            owner_id_str = str(repository["namespace"]["id"])
+        elif "owner" in repository:
+            owner_id_str = str(repository["owner"]["id"])
+            responses["owner"] = get_user(
+                users_api_url + owner_id_str, owner_id_str, "gitlab", use_cache=use_cache
+            )
+        if owner_id_str and "creator_id" in repository:
+            creator_id_str = str(repository["creator_id"])
+            if creator_id_str != owner_id_str:
+                responses["creator"] = get_user(
+                    users_api_url + creator_id_str,
+                    creator_id_str,
+                    "gitlab",
+                    use_cache=use_cache,
+                )
+    else:
+        raise ValueError(f"Not a git API, repo_kind={repo_kind}")
+
+    return responses
+
+
+def get_user(url: str, user: str, repo_kind: str, use_cache: bool = True) -> dict:
+    """Looks up a user or organization (by id or login) at the API URL. Each user is looked up only once per run, also
+    when multiple threads ask for it at the same time, and is reused from the on-disk cache for USER_CACHE_TTL seconds"""
+    key = (urlparse(url).netloc, user)
+    with user_cache_lock:
+        future = user_cache.get(key)
+        lookup = future is None
+        if lookup:
+            future = user_cache[key] = Future()
+    if lookup:
+        try:
+            future.set_result(
+                rate_limit_get(
+                    url,
+                    repo_kind,
+                    use_cache=use_cache,
+                    max_age=USER_CACHE_TTL if use_cache else None,
+                )
+            )
+        except Exception as e:
+            # don't remember failures
+            with user_cache_lock:
+                del user_cache[key]
+            future.set_exception(e)
+    return future.result()
+
+
+# the fields of a repository we query via the GitHub GraphQL API, they correspond to what fetch() obtains via REST
+GITHUB_GRAPHQL_FIELDS = """
+    name nameWithOwner url description homepageUrl createdAt pushedAt isArchived hasIssuesEnabled
+    licenseInfo { spdxId }
+    repositoryTopics(first: 100) { nodes { topic { name } } }
+    releases(first: 1) { totalCount nodes { name tagName } }
+    owner {
+        __typename login
+        ... on User { name company userEmail: email websiteUrl }
+        ... on Organization { name email websiteUrl }
+    }
+"""
+# (the email of a user is aliased because it is non-nullable, unlike that of an organization, and GraphQL does not allow such fields to share a name)
+
+
+def _graphql_to_rest(repository: dict) -> dict:
+    """Maps a repository from the GitHub GraphQL API onto the responses that fetch() obtains from the REST API"""
+    responses = {
+        "repository": {
+            "name": repository["name"],
+            "full_name": repository["nameWithOwner"],
+            "html_url": repository["url"],
+            "description": repository["description"],
+            "homepage": repository["homepageUrl"],
+            "created_at": repository["createdAt"],
+            "pushed_at": repository["pushedAt"],
+            "archived": repository["isArchived"],
+            "has_issues": repository["hasIssuesEnabled"],
+            "license": repository["licenseInfo"] and {"spdx_id": repository["licenseInfo"]["spdxId"]},
+            "topics": [node["topic"]["name"] for node in repository["repositoryTopics"]["nodes"]],
+            "owner": {"login": repository["owner"]["login"]},
+        },
+        "owner": {
+            "login": repository["owner"]["login"],
+            "type": repository["owner"]["__typename"],
+            "name": repository["owner"].get("name"),
+            "company": repository["owner"].get("company"),
+            "email": repository["owner"].get("email") or repository["owner"].get("userEmail"),
+            "blog": repository["owner"].get("websiteUrl"),
+        },
+    }
+    if repository["isArchived"]:
+        responses["releases"] = repository["releases"]["nodes"]
+    return responses
+
+
+def fetch_github_graphql(
+    sources: Iterable[str], args: AttribDict, batchsize: int = 50
+) -> dict:
+    """Fetches the responses for many GitHub repositories via the GraphQL API, a single request covers a whole batch of
+    repositories and includes their owners and releases. Requires a token (GITHUB_TOKEN). Returns a dictionary mapping
+    sources (as cleaned by _parse_source()) to responses in the same form as fetch() returns, repositories that could
+    not be queried are left out so the caller can fall back to the REST API for them."""
+    if not environ.get("GITHUB_TOKEN"):
+        print(
+            "GitHub GraphQL API requires a token (set GITHUB_TOKEN), falling back to the REST API",
+            file=sys.stderr,
+        )
+        return {}
+    url = f"{GITHUB_API}/graphql"
+    headers = {"Authorization": "bearer " + environ["GITHUB_TOKEN"]}
+    results = {}
+    repositories = []
+    for source in sources:
+        source, scheme, host = _parse_source(source)
+        try:
+            owner, name = source.replace(scheme + host, "")[1:].split("/")[:2]
+        except ValueError:
+            print(f"Unable to query {source} via the GitHub GraphQL API, it has no owner and name", file=sys.stderr)
+            continue
+        repositories.append((source, owner, name))
+    for offset in range(0, len(repositories), batchsize):
+        batch = repositories[offset : offset + batchsize]
+        # each repository gets an alias in the query, the owner and name are passed as variables
+        parameters = []
+        selections = []
+        variables = {}
+        for i, (source, owner, name) in enumerate(batch):
+            parameters.append(f"$owner{i}: String!, $name{i}: String!")
+            selections.append(
+                f"r{i}: repository(owner: $owner{i}, name: $name{i}) {{ {GITHUB_GRAPHQL_FIELDS} }}"
+            )
+            variables[f"owner{i}"] = owner
+            variables[f"name{i}"] = name
+        query = f"query({', '.join(parameters)}) {{ {' '.join(selections)} }}"
+        try:
+            RATELIMITER.acquire(url, "graphql")
+            print(f"Querying {url} for {len(batch)} repositories", file=sys.stderr)
+            response = fetch_url(
+                url,
+                headers=headers,
+                method="POST",
+                json={"query": query, "variables": variables},
+            )
+            response.raise_for_status()
+            if "x-ratelimit-remaining" in response.headers and "x-ratelimit-reset" in response.headers:
+                RATELIMITER.update(
+                    url,
+                    int(response.headers["x-ratelimit-remaining"]),
+                    int(response.headers["x-ratelimit-reset"]),
+                    "graphql",
+                )
+            data = response.json()
+        except (requests.RequestException, RateLimitExceeded, ValueError) as e:
+            # the repositories of this batch are left out, so they are fetched via the REST API instead
+            print(f"GitHub GraphQL API query failed, falling back to the REST API: {e}", file=sys.stderr)
+            continue
+        for error in data.get("errors") or []:
+            print(f"GitHub GraphQL API: {error.get('message')}", file=sys.stderr)
+        for i, (source, owner, name) in enumerate(batch):
+            repository = (data.get("data") or {}).get(f"r{i}")
+            if repository:
+                results[source] = _graphql_to_rest(repository)
+    return results
+
+
+def _fetch_resolved(
+    source: str, repo_kind: str, args: AttribDict, batch: Optional[Future] = None
+) -> Tuple[str, dict]:
+    """Fetches the API responses for a repository, the repo kind may be gitapi in which case it is determined first.
+    Responses for GitHub repositories are taken from the GraphQL batch if there is one and it has them."""
+    source = normalize_source(source)
+    if repo_kind == "gitapi":  # disambiguate
+        repo_kind = get_repo_kind(source)
+        if not repo_kind:
+            raise ValueError(f"Unable to disambiguate gitapi type")
+    if repo_kind == "github" and batch is not None:
+        try:
+            # the batch is keyed by the sources as _parse_source() cleans them
+            responses = batch.result().get(_parse_source(source)[0])
+        except Exception as e:
+            print(f"GitHub GraphQL API query failed, falling back to the REST API: {e}", file=sys.stderr)
+            responses = None
+        if responses:
+            return repo_kind, responses
+    return repo_kind, fetch(source, repo_kind, args)
+
+
+def submit_many(
+    executor: ThreadPoolExecutor, sources: Iterable[Tuple[str, str]], args: AttribDict
+) -> dict:
+    """Submits fetching the API responses for many repositories (pairs of source URL and repo kind, which may be gitapi)
+    to the executor. Requests are paced per host by the rate limiter. If args.github_graphql is set, GitHub repositories
+    are fetched in batches via the GraphQL API instead. Returns a dictionary mapping the pairs to futures of (repo_kind,
+    responses) tuples."""
+    sources = list(dict.fromkeys(sources))
+    batch = None
+    if args.github_graphql:
+        # submitted first, so it is running before any of the jobs that wait for it occupy the workers
+        batch = executor.submit(
+            fetch_github_graphql,
+            [normalize_source(source) for source, repo_kind in sources if repo_kind == "github"],
+            args,
+        )
+    return {
+        (source, repo_kind): executor.submit(
+            _fetch_resolved, source, repo_kind, args, batch
+        )
+        for source, repo_kind in sources
+    }
+
+
+def fetch_many(
+    sources: Iterable[Tuple[str, str]], args: AttribDict, max_workers: int = 8
+) -> Iterator[Tuple[str, str, dict]]:
+    """Fetches the API responses for many repositories (pairs of source URL and repo kind) concurrently, see
+    submit_many(). Yields (source, repo_kind, responses) tuples in the order of the input."""
+    sources = list(sources)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = submit_many(executor, sources, args)
+        for source, repo_kind in sources:
+            repo_kind, responses = futures[(source, repo_kind)].result()
+            yield source, repo_kind, responses
+
+
 def parse(
-    g: Graph, res: Union[URIRef, BNode], source: str, repo_kind: str, args: AttribDict
+    g: Graph,
+    res: Union[URIRef, BNode],
+    source: str,
+    repo_kind: str,
+    args: AttribDict,
+    responses: Optional[dict] = None,
+    lookup: Optional[Graph] = None,
 ) -> str:
+    """Parses the metadata from the git API into the graph. The API responses may be passed if they were already fetched (see fetch_many()).
+    Existing persons and organizations (e.g. the owner of other repositories) are reused from the lookup graph, which defaults to the graph itself."""
     source, scheme, host = _parse_source(source)
 
-    github_suffix = source.replace(scheme + host, "")[1:]
-    gitlab_suffix = github_suffix.replace("/", "%2F")
-    gitlab_repo_api_url = f"{scheme}{host}/api/v4/projects/{gitlab_suffix}"
+    if responses is None:
+        responses = fetch(source, repo_kind, args)
+    if lookup is None:
+        lookup = g
 
     if repo_kind == "github":
-        response = rate_limit_get(
-            f"{scheme}api.github.com/repos/{github_suffix}", "github"
-        )
-        _parse_github(response, g, res, f"{scheme}{host}", args)
+        _parse_github(responses, g, res, f"{scheme}{host}", args, lookup)
     elif repo_kind == "gitlab":
-        response = rate_limit_get(gitlab_repo_api_url, "gitlab")
-        _parse_gitlab(response, g, res, f"{scheme}{host}", args)
+        _parse_gitlab(responses, g, res, f"{scheme}{host}", args, lookup)
     else:
         raise ValueError(f"Not a git API, repo_kind={repo_kind}")
 
@@ -102,9 +480,16 @@ github_crosswalk_table = {
 
 
 # the same as requests.get(args).json(), but protects against rate limiting
+# responses are cached and revalidated with conditional requests (use_cache=False to disable)
 # Adapted from source: https://github.com/KnowledgeCaptureAndDiscovery/somef (MIT licensed)
 def rate_limit_get(
-    url: str, repo_kind: Optional[str], backoff_rate=2, initial_backoff=1, **kwargs
+    url: str,
+    repo_kind: Optional[str],
+    backoff_rate=2,
+    initial_backoff=1,
+    use_cache=True,
+    max_age=None,
+    **kwargs,
 ) -> dict:
     rate_limited = True
     data = {}
@@ -125,7 +510,14 @@ def rate_limit_get(
         has_token = True
     while rate_limited:
         print(f"Querying {url}")
-        response = requests.get(url, **kwargs)
+        # a token is only spent when a request is actually sent, not for responses served from the cache
+        response = cached_get(
+            url,
+            use_cache=use_cache,
+            max_age=max_age,
+            before_request=lambda: RATELIMITER.acquire(url),
+            **kwargs,
+        )
         rate_limit_remaining = int(
             response.headers.get(
                 "RateLimit-Remaining"
@@ -140,6 +532,7 @@ def rate_limit_get(
             )
         )
         if rate_limit_remaining > -1 and epochtime > 0:
+            RATELIMITER.update(url, rate_limit_remaining, epochtime)
             date_reset = datetime.fromtimestamp(epochtime)
             print(
                 f"Remaining {repo_kind} API requests: {rate_limit_remaining} ### Next rate limit reset at: {date_reset} (has_token={has_token})"
@@ -149,6 +542,14 @@ def rate_limit_get(
         data = response.json()
         if "message" in data and "API rate limit exceeded" in data["message"]:
             rate_limited = True
+            if rate_limit_remaining > -1 and epochtime > 0:
+                # the rate limiter knows when the limit resets, the next attempt waits for it
+                RATELIMITER.update(url, 0, epochtime)
+                print(
+                    f"{repo_kind} API: rate limited. Waiting for reset at {date_reset} (has_token={has_token})",
+                    file=sys.stderr,
+                )
+                continue
             print(
                 f"{repo_kind} API: rate limited. Backing off for {initial_backoff} seconds (has_token={has_token})",
                 file=sys.stderr,
@@ -167,12 +568,40 @@ def rate_limit_get(
     return data
 
 
+def _forge_user_node(
+    lookup: Graph,
+    key: Optional[Tuple[str, str]],
+    type: URIRef,
+    name: str,
+    baseuri: Optional[str],
+    prefix: str,
+) -> Tuple[URIRef, bool]:
+    """Returns the node for a forge user or organization, identified by (forge host, login), and whether it is new.
+    Nodes are reused only for the same forge user, never for another one that merely has the same name"""
+    forge_users = get_graph_index(lookup).forge_users
+    node = forge_users.get(key) if key else None
+    if node is not None and (node, RDF.type, type) in lookup:
+        return node, False
+    node = URIRef(generate_uri(name, baseuri, prefix=prefix))
+    if key:
+        if any(other != key and othernode == node for other, othernode in forge_users.items()):
+            # another forge user with the same name
+            node = URIRef(generate_uri(name + "-" + key[1], baseuri, prefix=prefix))
+        forge_users[key] = node
+    return node, True
+
+
 def _parse_github(
-    response: dict, g: Graph, res: Union[URIRef, BNode], source: str, args: AttribDict
+    responses: dict,
+    g: Graph,
+    res: Union[URIRef, BNode],
+    source: str,
+    args: AttribDict,
+    lookup: Graph,
 ):
-    """Query and parse from the github API"""
+    """Parse the responses from the github API"""
     print(f"    Parsing Github API response", file=sys.stderr)
-    users_api_url = f"https://api.github.com/users/"
+    response = responses["repository"]
 
     # repo = response['name']
     for prop, github_key in github_crosswalk_table.items():
@@ -195,9 +624,7 @@ def _parse_github(
         g.add((res, CODEMETA.issueTracker, Literal(response["html_url"] + "/issues")))
 
     if response.get("archived", False):
-        reponame = response.get("full_name") #namespace/repo
-        releases_api_url = f"https://api.github.com/repos/{reponame}/releases"
-        releases = rate_limit_get(releases_api_url, "github")
+        releases = responses.get("releases", [])
         if (res, CODEMETA.developmentStatus, REPOSTATUS.active) in g or (res, CODEMETA.developmentStatus, REPOSTATUS.inactive) or len(releases) > 0:
             delete_repostatus(g,res)
             g.add((res,CODEMETA.developmentStatus, REPOSTATUS.unsupported))
@@ -205,20 +632,21 @@ def _parse_github(
             delete_repostatus(g,res)
             g.add((res,CODEMETA.developmentStatus, REPOSTATUS.abandoned))
 
-    if "owner" in response:
-        owner = response["owner"]["login"]
-        owner_api_url = f"{users_api_url}{owner}"
-        response = rate_limit_get(owner_api_url, "github")
+    if "owner" in responses:
+        response = responses["owner"]
         owner_type = response.get("type", "").lower()
         owner_res = None
+        # reuse the node of this GitHub user if the graph already has it (e.g. for other repositories of the same owner)
+        key = (urlparse(source).netloc, response["login"]) if response.get("login") else None
         if owner_type == "user" and response.get("name"):
             firstname, lastname = parse_human_name(response["name"])
-            owner_res = URIRef(
-                generate_uri(firstname + "-" + lastname, args.baseuri, prefix="person")
+            owner_res, new = _forge_user_node(
+                lookup, key, SDO.Person, firstname + "-" + lastname, args.baseuri, "person"
             )
-            g.add((owner_res, RDF.type, SDO.Person))
-            g.add((owner_res, SDO.givenName, Literal(firstname)))
-            g.add((owner_res, SDO.familyName, Literal(lastname)))
+            if new:
+                g.add((owner_res, RDF.type, SDO.Person))
+                g.add((owner_res, SDO.givenName, Literal(firstname)))
+                g.add((owner_res, SDO.familyName, Literal(lastname)))
             g.add((res, SDO.author, owner_res))
             g.add((res, SDO.maintainer, owner_res))
             if response.get("company"):
@@ -229,11 +657,12 @@ def _parse_github(
                 g.add((affil_res, SDO.name, Literal(response["company"])))
                 g.add((owner_res, SDO.affiliation, affil_res))
         elif owner_type == "organization" and response.get("name"):
-            owner_res = URIRef(
-                generate_uri(response.get("name"), args.baseuri, prefix="org")
+            owner_res, new = _forge_user_node(
+                lookup, key, SDO.Organization, response["name"], args.baseuri, "org"
             )
-            g.add((owner_res, RDF.type, SDO.Organization))
-            g.add((owner_res, SDO.name, Literal(response.get("name"))))
+            if new:
+                g.add((owner_res, RDF.type, SDO.Organization))
+                g.add((owner_res, SDO.name, Literal(response.get("name"))))
             g.add((res, SDO.producer, owner_res))
         if owner_res:
             if response.get("email"):
@@ -255,10 +684,15 @@ gitlab_crosswalk_table = {
 
 
 def _parse_gitlab(
-    response: dict, g: Graph, res: Union[URIRef, BNode], source, args: AttribDict
+    responses: dict,
+    g: Graph,
+    res: Union[URIRef, BNode],
+    source,
+    args: AttribDict,
+    lookup: Graph,
 ):
-    """Query and parse from the gitlab API"""
-    users_api_url = f"{source}/api/v4/users/"
+    """Parse the responses from the gitlab API"""
+    response = responses["repository"]
     # Processing start
     for prop, gitlab_key in gitlab_crosswalk_table.items():
         if gitlab_key in response and response[gitlab_key]:
@@ -282,21 +716,15 @@ def _parse_gitlab(
     if response.get("open_issues_count", False) > 0:
         g.add((res, CODEMETA.issueTracker, Literal(response["_links"]["issues"])))
 
-    # https://docs.gitlab.com/ee/api/users.html
-    # namespace kind can be just group or user
-    owner_id_str = ""
+    # the owner was looked up by fetch() if it is not a user namespace
     owner_name = ""
     user_url = ""
     public_mail = ""
     if "namespace" in response and response["namespace"]["kind"] == "user":
-        owner_id_str = str(response["namespace"]["id"])
-        owner_api_url = users_api_url + owner_id_str
         owner_name = response["namespace"]["name"]
         user_url = response["namespace"]["web_url"]
     elif "owner" in response:
-        owner_id_str = str(response["owner"]["id"])
-        owner_api_url = users_api_url + owner_id_str
-        response_owner = rate_limit_get(owner_api_url, "gitlab")
+        response_owner = responses["owner"]
         owner_name = response_owner["owner"]["name"]
         user_url = response_owner["owner"]["web_url"]
         if response_owner.get("public_email"):
@@ -304,22 +732,20 @@ def _parse_gitlab(
     else:
         return
     firstname, lastname = parse_human_name(owner_name)
+    # the user URL identifies the user on this forge, reuse the node if the graph already has it (e.g. for other repositories of the same owner)
     owner_res = URIRef(user_url)
-    g.add((owner_res, RDF.type, SDO.Person))
-    g.add((owner_res, SDO.givenName, Literal(firstname)))
-    g.add((owner_res, SDO.familyName, Literal(lastname)))
+    if (owner_res, RDF.type, SDO.Person) not in lookup:
+        g.add((owner_res, RDF.type, SDO.Person))
+        g.add((owner_res, SDO.givenName, Literal(firstname)))
+        g.add((owner_res, SDO.familyName, Literal(lastname)))
     g.add((owner_res, SDO.url, Literal(user_url)))
     if public_mail != "":
         g.add((owner_res, SDO.email, Literal(public_mail)))
     # Creator considered as author
     response_creator_url_field = user_url
     response_creator_name = owner_name
-    if "creator_id" in response:
-        creator_id_str = str(response["creator_id"])
-        if creator_id_str != owner_id_str:
-            creator_api_url = users_api_url + creator_id_str
-            response_creator = rate_limit_get(creator_api_url, "gitlab")
-            response_creator_url_field = response_creator["web_url"]
+    if "creator" in responses:
+        response_creator_url_field = responses["creator"]["web_url"]
     # Object X must be an rdflib term:  g.add((URIRef(response_creator_url_field), SDO.author, response_creator_name))
     # g.add((res, SDO.maintainer, owner_res))
     # if response_owner.get('work_information'): is like company?
@@ -24,6 +24,7 @@ from codemeta.common import (
     get_last_component,
 )
 from codemeta.crosswalk import readcrosswalk, CWKey
+from codemeta.terms import PYTHON3, PYTHON_EXACT, intern_literal
 import pyproject_parser
 import pep517.meta
 
@@ -192,22 +193,9 @@ def parse_python(
     if crosswalk is None:
         _, crosswalk = readcrosswalk((CWKey.PYPI,))
     if args.exactplatformversion:
-        g.add(
-            (
-                res,
-                SDO.runtimePlatform,
-                Literal(
-                    "Python "
-                    + str(sys.version_info.major)
-                    + "."
-                    + str(sys.version_info.minor)
-                    + "."
-                    + str(sys.version_info.micro)
-                ),
-            )
-        )
+        g.add((res, SDO.runtimePlatform, PYTHON_EXACT))
     else:
-        g.add((res, SDO.runtimePlatform, Literal("Python 3")))
+        g.add((res, SDO.runtimePlatform, PYTHON3))
 
     prevdir = None
     pkg = None
@@ -485,27 +473,14 @@ def add_dependency(g: Graph, res: Union[URIRef, BNode], value: str, args: Attrib
                 )
             )  # version number is deliberately in ID here!
             g.add((depres, RDF.type, SDO.SoftwareApplication))
-            g.add((depres, SDO.identifier, Literal(dependency)))
-            g.add((depres, SDO.name, Literal(dependency)))
+            g.add((depres, SDO.identifier, intern_literal(dependency)))
+            g.add((depres, SDO.name, intern_literal(dependency)))
             if args.exactplatformversion:
-                g.add(
-                    (
-                        depres,
-                        SDO.runtimePlatform,
-                        Literal(
-                            "Python "
-                            + str(sys.version_info.major)
-                            + "."
-                            + str(sys.version_info.minor)
-                            + "."
-                            + str(sys.version_info.micro)
-                        ),
-                    )
-                )
+                g.add((depres, SDO.runtimePlatform, PYTHON_EXACT))
             else:
-                g.add((depres, SDO.runtimePlatform, Literal("Python 3")))
+                g.add((depres, SDO.runtimePlatform, PYTHON3))
             if depversion:
-                g.add((depres, SDO.version, Literal(depversion)))
+                g.add((depres, SDO.version, intern_literal(depversion)))
             g.add((res, CODEMETA.softwareRequirements, depres))
 
 
@@ -541,22 +516,9 @@ def add_entrypoint(
         g.add((targetapp, SDO.description, Literal(description)))
     g.add((targetapp, SOFTWARETYPES.executableName, Literal(name)))
     if args.exactplatformversion:
-        g.add(
-            (
-                targetapp,
-                SDO.runtimePlatform,
-                Literal(
-                    "Python "
-                    + str(sys.version_info.major)
-                    + "."
-                    + str(sys.version_info.minor)
-                    + "."
-                    + str(sys.version_info.micro)
-                ),
-            )
-        )
+        g.add((targetapp, SDO.runtimePlatform, PYTHON_EXACT))
     else:
-        g.add((targetapp, SDO.runtimePlatform, Literal("Python 3")))
+        g.add((targetapp, SDO.runtimePlatform, PYTHON3))
     g.add((res, CODEMETA.isSourceCodeOf, targetapp))
 
 
@@ -593,22 +555,9 @@ def test_and_set_library(
             )
         )  # see https://python.github.io/peps/pep-0503/
         if args.exactplatformversion:
-            g.add(
-                (
-                    targetapp,
-                    SDO.runtimePlatform,
-                    Literal(
-                        "Python "
-                        + str(sys.version_info.major)
-                        + "."
-                        + str(sys.version_info.minor)
-                        + "."
-                        + str(sys.version_info.micro)
-                    ),
-                )
-            )
+            g.add((targetapp, SDO.runtimePlatform, PYTHON_EXACT))
         else:
-            g.add((targetapp, SDO.runtimePlatform, Literal("Python 3")))
+            g.add((targetapp, SDO.runtimePlatform, PYTHON3))
 
 
 def test_and_set_identifier(g: Graph, res: Union[URIRef, BNode], args: AttribDict):
@@ -1,7 +1,8 @@
 import sys
+import re
 import json
 import os.path
-from typing import Union, Iterator
+from typing import Union, Iterator, Tuple, List
 import requests
 import yaml
 from rdflib import Graph, URIRef, BNode, Literal
@@ -9,11 +10,14 @@ from rdflib.namespace import RDF #type: ignore
 from codemeta.common import (
     AttribDict,
     SDO,
+    CODEMETA,
     generate_uri,
     add_authors,
     get_last_component,
+    scratch_graph,
 )
 from codemeta.parsers.jsonld import parse_jsonld_data
+from codemeta.remote import fetch
 from bs4 import BeautifulSoup
 
 
@@ -21,6 +25,41 @@ class MiddlewareObstructionException(Exception):
     pass
 
 
+JSONLD_SCRIPT = re.compile(
+    r"<script[^>]*\stype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.I | re.S,
+)
+JSONLD_PATTERN = re.compile(JSONLD_SCRIPT.pattern.encode("ascii"), re.I | re.S)
+SCRIPT_START = re.compile(rb"<script", re.I)
+HEAD_END = re.compile(r"</head\s*>", re.I)
+H1 = re.compile(r"<h1[\s>].*?</h1\s*>", re.I | re.S)
+
+
+class JSONLDScanner:
+    """Watches an HTML page while it is being downloaded, and tells fetch() to stop reading as soon as the first JSON-LD
+    script block is complete; we take all metadata from that block then. Pages without JSON-LD are read entirely (such a
+    block may occur anywhere), but only their <head> is parsed."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0  # where to resume searching
+
+    def __call__(self, response: requests.Response, chunk: bytes) -> bool:
+        if not response.headers.get("content-type", "").startswith("text/html"):
+            return False
+        self.buffer += chunk
+        if JSONLD_PATTERN.search(self.buffer, self.offset):
+            return True
+        # a script block may continue in the next chunk, resume searching from the last one that started
+        last = None
+        for match in SCRIPT_START.finditer(self.buffer, self.offset):
+            last = match.start()
+        if last is None:
+            last = max(self.offset, len(self.buffer) - len(b"<script"))
+        self.offset = last
+        return False
+
+
 def detect_type(data):
     if "@context" in data and "@type" in data:
         value = data["@context"]
@@ -96,11 +135,12 @@ def add_missing_url_scheme(data, original_url: str):
 def parse_web(
     g: Graph, res: Union[URIRef, BNode], url, args: AttribDict
 ) -> Iterator[Union[URIRef, BNode, None]]:
-    r = requests.get(
+    r = fetch(
         url,
         headers={
             "Accept": "application/json+ld;q=1.0,application/json;q=0.9,application/x-yaml;q=0.8,application/xml;q=0.7;text/html;q=0.6;text/plain;q=0.1"
         },
+        until=JSONLDScanner(),
     )
     r.raise_for_status()
     contenttype = r.headers.get("content-type", "").split(";")[0].strip()
@@ -134,14 +174,17 @@ def parse_web(
             )
         # normal behaviour
         print("    Parsing html...", file=sys.stderr)
-        soup = BeautifulSoup(r.text, "html.parser")
-        scriptblock = soup.find("script", {"type": "application/ld+json"})
+        html = r.text
+        scriptblock = JSONLD_SCRIPT.search(html)
         if scriptblock:
             # Does the site provide proper JSON-LD metadata itself?
             print("    Found a json-ld script block", file=sys.stderr)
-            data = json.loads("".join(scriptblock.contents)) #type: ignore
+            data = json.loads(scriptblock.group(1))
         else:
             print("    Parsing site metadata", file=sys.stderr)
+            # all metadata is in the head, there is no need to parse the (potentially large) body
+            headend = HEAD_END.search(html)
+            soup = BeautifulSoup(html[: headend.end()] if headend else html, "lxml")
             name = get_meta(
                 soup, "schema:name", "og:site_name", "og:title", "twitter:title"
             )
@@ -149,9 +192,11 @@ def parse_web(
                 name = soup.title.text
                 name = name.strip()
             if not name:
-                for e in soup.find("h1"): #type: ignore
-                    name = e.text
-                    name = name.strip()
+                h1 = H1.search(html)
+                if h1:
+                    for e in BeautifulSoup(h1.group(0), "lxml").find("h1"): #type: ignore
+                        name = e.text
+                        name = name.strip()
 
             if args.with_stypes:
                 targetres = URIRef(
@@ -305,3 +350,47 @@ def parse_web(
                 f"    Unable to detect data type of data returned by {url}",
                 file=sys.stderr,
             )
+
+
+def parse_web_graph(
+    res: Union[URIRef, BNode], url, args: AttribDict
+) -> Tuple[Graph, List[Union[URIRef, BNode, None]]]:
+    """Parses a web source into a graph of its own, so it can run in a worker thread. Returns the graph and the target resources (as yielded by parse_web())"""
+    g = scratch_graph()
+    targets = list(parse_web(g, res, url, args))
+    return g, targets
+
+
+def discover_service_urls(
+    g: Graph, res: Union[URIRef, BNode]
+) -> List[Tuple[Union[URIRef, BNode], str]]:
+    """Returns (service, url) pairs for the url and serviceUrl of all services the resource is the source code of, in a deterministic order"""
+    found = []
+    for service in sorted(g.objects(res, CODEMETA.isSourceCodeOf)):
+        for prop in (SDO.url, SDO.serviceUrl):
+            for url in sorted(g.objects(service, prop)):
+                if str(url).startswith(("http://", "https://")) and (service, str(url)) not in found:
+                    found.append((service, str(url)))
+    return found
+
+
+def add_service_metadata(
+    g: Graph,
+    service: Union[URIRef, BNode],
+    newgraph: Graph,
+    targets: List[Union[URIRef, BNode, None]],
+):
+    """Adds the metadata found at the URL of a service (as returned by parse_web_graph()) to the service, for the
+    properties it does not have yet. The new graph is only read, it may be shared by several services with the same URL."""
+    known = set(g.predicates(service))
+    targets = [targetres for targetres in targets if targetres is not None]
+    for targetres in targets:
+        added = set()
+        for p, o in newgraph.predicate_objects(targetres):
+            if p not in known:
+                g.add((service, p, o))
+                added.add(p)
+        # a later target (a page may describe multiple) does not add to what an earlier one filled in
+        known |= added
+    # everything else (e.g. authors the targets refer to) is taken as is
+    g.addN((s, p, o, g) for s, p, o in newgraph if s not in targets)
@@ -0,0 +1,615 @@
+"""Shared HTTP layer for querying remote metadata sources (e.g. the GitHub and GitLab APIs). All requests go through a
+single pooled session, and responses that carry a validator (ETag or Last-Modified) are cached on disk and revalidated
+with conditional requests, so unchanged resources only cost a cheap 304 Not Modified. Requests to rate-limited APIs
+are paced per host by the RATELIMITER, so they can safely be made from multiple threads.
+
+All fetches are subject to the same POLICY: connect/read timeouts, a maximum response size, and a circuit breaker per
+host that fails fast after repeated errors. Each fetch is reported along with its timing.
+
+For offline and deterministic runs, all fetches can be recorded to a CASSETTE directory and later replayed from it
+(optionally with injected latency), see CODEMETAPY_HTTP_MODE, CODEMETAPY_CASSETTE and CODEMETAPY_REPLAY_LATENCY."""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Union, Tuple, List, Callable, Iterator
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import ReadTimeoutError, ProtocolError, DecodeError
+
+# responses may contain private data (obtained with GITHUB_TOKEN/GITLAB_TOKEN), so they are cached per user rather
+# than in a shared temporary directory, and only the user may read them
+CACHEDIR = os.environ.get(
+    "CODEMETAPY_CACHEDIR",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "codemetapy",
+    ),
+)
+
+# request headers that identify who is asking, responses may differ per identity (e.g. for private repositories) so these are part of the cache key
+IDENTITY_HEADERS = ("Authorization", "PRIVATE-TOKEN")
+
+# response headers that are stored along with a cached response
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+POOLSIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def makedirs_private(directory: str):
+    """Creates a directory (if it doesn't exist yet) that is accessible only to the current user"""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+
+def open_private(path: str):
+    """Opens a file for writing (text, utf-8) that is readable only by the current user"""
+    return os.fdopen(
+        os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8"
+    )
+
+
+def get_session() -> requests.Session:
+    """Returns the shared session, connections (and TLS handshakes) are reused between requests to the same host"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOLSIZE, pool_maxsize=POOLSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+
+class CircuitOpen(requests.ConnectionError):
+    pass
+
+
+class FetchPolicy:
+    """The limits that apply to all remote fetches"""
+
+    def __init__(
+        self,
+        connect_timeout: float = 10,
+        read_timeout: float = 30,
+        total_timeout: float = 120,
+        max_size: int = 10 * 1024 * 1024,
+        failure_threshold: int = 3,
+        cooldown: float = 300,
+    ):
+        self.connect_timeout = connect_timeout
+        # the read timeout applies to each read from the socket, the total timeout to reading the entire response
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_size = max_size
+        # after this many consecutive failures, fetches from the host fail immediately for the duration of the cooldown (in seconds)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+
+POLICY = FetchPolicy(
+    connect_timeout=float(os.environ.get("CODEMETAPY_CONNECT_TIMEOUT", 10)),
+    read_timeout=float(os.environ.get("CODEMETAPY_READ_TIMEOUT", 30)),
+    total_timeout=float(os.environ.get("CODEMETAPY_TOTAL_TIMEOUT", 120)),
+    max_size=int(os.environ.get("CODEMETAPY_MAX_RESPONSE_SIZE", 10 * 1024 * 1024)),
+)
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of a single host"""
+
+    def __init__(self):
+        self.failures = 0
+        self.opened = None  # time at which the breaker opened
+        self.lock = threading.Lock()
+
+    def check(self, url: str, policy: FetchPolicy):
+        with self.lock:
+            if self.opened is not None:
+                if time.time() - self.opened < policy.cooldown:
+                    raise CircuitOpen(
+                        f"Not fetching {url}, the host failed {self.failures} times in a row"
+                    )
+                # cooldown is over, let the next fetch through as a trial
+                self.opened = None
+
+    def record(self, success: bool, policy: FetchPolicy):
+        with self.lock:
+            if success:
+                self.failures = 0
+            else:
+                self.failures += 1
+                if self.failures >= policy.failure_threshold:
+                    self.opened = time.time()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = urlparse(url).netloc
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+# log of all fetches: (url, outcome, seconds, bytes) tuples, the outcome is the status code or the name of the error
+FETCHLOG: List[Tuple[str, Union[int, str], float, int]] = []
+_fetchlog_lock = threading.Lock()
+
+
+def _log_fetch(url: str, outcome: Union[int, str], seconds: float, size: int):
+    with _fetchlog_lock:
+        FETCHLOG.append((url, outcome, seconds, size))
+    print(f"    Fetched {url}: {outcome} in {seconds:.2f}s ({size} bytes)", file=sys.stderr)
+
+
+def fetch_report(start: int = 0) -> str:
+    """Summarises the timing of the fetches in the log (from the start offset onward)"""
+    with _fetchlog_lock:
+        entries = FETCHLOG[start:]
+    failed = [entry for entry in entries if not isinstance(entry[1], int) or entry[1] >= 400]
+    slowest = max(entries, key=lambda entry: entry[2], default=None)
+    report = f"{len(entries)} remote fetches took {sum(entry[2] for entry in entries):.2f}s in total, {len(failed)} failed"
+    if slowest:
+        report += f", slowest was {slowest[0]} ({slowest[2]:.2f}s)"
+    return report
+
+
+def _read_chunks(
+    response: requests.Response, url: str, deadline: float, policy: FetchPolicy
+) -> Iterator[bytes]:
+    """Reads the body of a streamed response in chunks, without exceeding the deadline (a time.monotonic() value).
+    The deadline is enforced at the socket level: before every read the socket timeout is shrunk to the remaining
+    time, and reads return whatever data is available rather than waiting for a full chunk, so a server that trickles
+    bytes can not keep us reading past the deadline."""
+    raw = response.raw
+    connection = getattr(raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    # urllib3 >= 2 offers read1(), which does at most one read from the socket
+    read = getattr(raw, "read1", None)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(
+                f"Reading the response from {url} took more than {policy.total_timeout}s"
+            )
+        if sock is not None:
+            sock.settimeout(min(policy.read_timeout, remaining))
+        try:
+            if read is not None:
+                chunk = read(65536, decode_content=True)
+            else:
+                chunk = raw.read(1024, decode_content=True)
+        except ReadTimeoutError as e:
+            if time.monotonic() >= deadline:
+                raise requests.Timeout(
+                    f"Reading the response from {url} took more than {policy.total_timeout}s"
+                )
+            raise requests.ConnectionError(e)
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        if not chunk:
+            return
+        yield chunk
+
+
+class CassetteMiss(requests.ConnectionError):
+    pass
+
+
+class Cassette:
+    """A directory of recorded HTTP responses, one JSON file per request. In record mode, every response that is
+    fetched is stored; in replay mode, responses are served from the directory and nothing goes over the network. The
+    latency is the delay (in seconds) injected into each replayed response, or "recorded" to replay the time the
+    original fetch took."""
+
+    MODES = ("record", "replay")
+
+    def __init__(
+        self, directory: str, mode: str = "replay", latency: Union[float, str] = 0
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid cassette mode: {mode}, expected one of {', '.join(self.MODES)}")
+        if latency != "recorded":
+            latency = float(latency)
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+
+    @staticmethod
+    def key(method: str, url: str, body: Optional[bytes] = None) -> str:
+        """Computes the key of a request. Request headers are deliberately not part of it, so a cassette recorded with a token can be replayed without."""
+        key = hashlib.sha256(method.upper().encode("utf-8") + b"\0" + url.encode("utf-8"))
+        if body:
+            key.update(b"\0" + body)
+        return key.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        response: requests.Response,
+        seconds: float,
+    ):
+        makedirs_private(self.directory)
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "responseurl": response.url,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in ("set-cookie", "content-encoding", "transfer-encoding")
+            },
+            "elapsed": seconds,
+            # latin-1 maps all bytes one-to-one onto characters, so any body survives the JSON round-trip
+            "body": response.content.decode("latin-1"),
+        }
+        path = self.path(self.key(method, url, body))
+        tmpfile = path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open_private(tmpfile) as f:
+            json.dump(entry, f, indent=1)
+        os.replace(tmpfile, path)
+
+    def replay(
+        self, method: str, url: str, body: Optional[bytes]
+    ) -> Tuple[requests.Response, float]:
+        """Returns the recorded response and the latency to inject, raises CassetteMiss if the request was never recorded"""
+        try:
+            with open(self.path(self.key(method, url, body)), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            raise CassetteMiss(f"No recorded response for {method.upper()} {url} in {self.directory}")
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.url = entry["responseurl"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("latin-1")
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        latency = entry["elapsed"] if self.latency == "recorded" else self.latency
+        return response, latency
+
+
+def _request_body(kwargs: dict) -> Optional[bytes]:
+    """Returns the body a request would send, as far as it identifies the request"""
+    if kwargs.get("json") is not None:
+        return json.dumps(kwargs["json"], sort_keys=True).encode("utf-8")
+    data = kwargs.get("data")
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    if isinstance(data, bytes):
+        return data
+    if data:
+        return json.dumps(data, sort_keys=True).encode("utf-8")
+    return None
+
+
+CASSETTE: Optional[Cassette] = (
+    Cassette(
+        os.environ.get("CODEMETAPY_CASSETTE", os.path.join(CACHEDIR, "cassette")),
+        os.environ["CODEMETAPY_HTTP_MODE"],
+        os.environ.get("CODEMETAPY_REPLAY_LATENCY", 0),
+    )
+    if os.environ.get("CODEMETAPY_HTTP_MODE")
+    else None
+)
+
+
+@contextmanager
+def use_cassette(cassette: Optional[Cassette]):
+    """Makes the cassette the active one for the duration of the context, and restores the previously active one
+    afterwards. If the cassette is None, the active cassette (if any) remains active."""
+    global CASSETTE
+    previous = CASSETTE
+    if cassette is not None:
+        CASSETTE = cassette
+    try:
+        yield CASSETTE
+    finally:
+        CASSETTE = previous
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Returns the active cassette, if any. Local caches of remote state should be bypassed while one is active, so
+    that recordings are complete and replays do not depend on what happens to be cached."""
+    return CASSETTE
+
+
+def fetch(
+    url: str,
+    headers: Optional[dict] = None,
+    method: str = "GET",
+    policy: Optional[FetchPolicy] = None,
+    timeout: Optional[Union[float, Tuple[float, float]]] = None,
+    until: Optional[Callable[[requests.Response, bytes], bool]] = None,
+    **kwargs,
+) -> requests.Response:
+    """Fetches a URL via the shared session, according to the fetch policy: the response is read in a streaming fashion
+    and aborted when it exceeds the maximum size or takes too long. Hosts that failed repeatedly are not contacted
+    (CircuitOpen is raised) until a cooldown has passed. If until is set, it is called with the response and each chunk
+    that is read, reading stops early (leaving a partial body) once it returns True. Additional keyword arguments are
+    passed to requests.
+
+    If a CASSETTE is in replay mode, the response is served from it instead, in record mode the response is stored in it."""
+    if policy is None:
+        policy = POLICY
+    if timeout is None:
+        timeout = (policy.connect_timeout, policy.read_timeout)
+    cassette = CASSETTE
+    if cassette is not None:
+        body = _request_body(kwargs)
+        if cassette.mode == "replay":
+            try:
+                response, latency = cassette.replay(method, url, body)
+            except CassetteMiss:
+                _log_fetch(url, "CassetteMiss", 0.0, 0)
+                raise
+            if latency:
+                time.sleep(latency)
+            _log_fetch(url, response.status_code, latency, len(response.content))
+            return response
+        if headers:
+            # record complete responses only, so replays don't depend on the state of the response cache
+            headers = {
+                name: value
+                for name, value in headers.items()
+                if name not in ("If-None-Match", "If-Modified-Since")
+            }
+    breaker = get_breaker(url)
+    breaker.check(url, policy)
+    begintime = time.monotonic()
+    size = 0
+    try:
+        response = get_session().request(
+            method, url, headers=headers, stream=True, timeout=timeout, **kwargs
+        )
+        try:
+            if int(response.headers.get("Content-Length", 0)) > policy.max_size:
+                raise ResponseTooLarge(
+                    f"Response from {url} is too large ({response.headers['Content-Length']} bytes)"
+                )
+            chunks = []
+            for chunk in _read_chunks(
+                response, url, begintime + policy.total_timeout, policy
+            ):
+                size += len(chunk)
+                if size > policy.max_size:
+                    raise ResponseTooLarge(
+                        f"Response from {url} exceeds {policy.max_size} bytes"
+                    )
+                chunks.append(chunk)
+                if until is not None and until(response, chunk):
+                    # the caller has what it needs, don't read the rest
+                    break
+            response._content = b"".join(chunks)
+            response._content_consumed = True
+        finally:
+            response.close()
+    except ResponseTooLarge:
+        _log_fetch(url, "ResponseTooLarge", time.monotonic() - begintime, size)
+        breaker.record(True, policy)  # the host itself is fine
+        raise
+    except requests.RequestException as e:
+        _log_fetch(url, e.__class__.__name__, time.monotonic() - begintime, size)
+        breaker.record(False, policy)
+        raise
+    _log_fetch(url, response.status_code, time.monotonic() - begintime, size)
+    breaker.record(response.status_code < 500, policy)
+    if cassette is not None:
+        cassette.record(method, url, body, response, time.monotonic() - begintime)
+    return response
+
+
+def cache_key(url: str, headers: Optional[dict] = None) -> str:
+    """Computes the cache key for a request, from the URL and the identity (token) of the requester. The token itself is only included hashed."""
+    key = hashlib.sha256(url.encode("utf-8"))
+    if headers:
+        for name in IDENTITY_HEADERS:
+            if headers.get(name):
+                key.update(b"\0" + name.encode("utf-8") + b"\0")
+                key.update(hashlib.sha256(headers[name].encode("utf-8")).digest())
+    return key.hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of HTTP responses, one JSON file per response"""
+
+    def __init__(self, directory: str = CACHEDIR):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def load(self, key: str) -> Optional[dict]:
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, entry: dict):
+        makedirs_private(self.directory)
+        # write to a temporary file first and move it into place, so concurrent readers never see a partial entry
+        tmpfile = self.path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open_private(tmpfile) as f:
+            json.dump(entry, f)
+        os.replace(tmpfile, self.path(key))
+
+
+CACHE = ResponseCache()
+
+
+def _to_entry(response: requests.Response) -> dict:
+    return {
+        "url": response.url,
+        "date": time.time(),
+        "headers": {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        },
+        # latin-1 maps all bytes one-to-one onto characters, so any body survives the JSON round-trip
+        "body": response.content.decode("latin-1"),
+    }
+
+
+def _from_entry(
+    entry: dict, revalidation: Optional[requests.Response] = None
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.url = entry["url"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    if revalidation is not None:
+        # a 304 carries updated headers (e.g. the current rate limit), they take precedence over the stored ones
+        response.headers.update(revalidation.headers)
+        response.request = revalidation.request
+    response._content = entry["body"].encode("latin-1")
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.reason = "OK"
+    return response
+
+
+def cached_get(
+    url: str,
+    headers: Optional[dict] = None,
+    use_cache: bool = True,
+    cache: Optional[ResponseCache] = None,
+    max_age: Optional[float] = None,
+    before_request: Optional[Callable[[], object]] = None,
+    **kwargs,
+) -> requests.Response:
+    """Performs a GET request via fetch(). If a response for the same URL and identity is in the cache, the request
+    is made conditional and the cached response is returned if the server replies 304 Not Modified. If max_age (in
+    seconds) is set, a cached response that was (re)validated less than max_age ago is returned without any request.
+    If before_request is set, it is called right before a request is actually sent (e.g. to acquire a rate limit token)."""
+    if not use_cache or CASSETTE is not None:
+        if before_request is not None:
+            before_request()
+        return fetch(url, headers=headers, **kwargs)
+    if cache is None:
+        cache = CACHE
+    key = cache_key(url, headers)
+    entry = cache.load(key)
+    if entry and max_age is not None and time.time() - entry.get("date", 0) < max_age:
+        return _from_entry(entry)
+    requestheaders = dict(headers) if headers else {}
+    if entry:
+        if "ETag" in entry["headers"]:
+            requestheaders["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            requestheaders["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+    if before_request is not None:
+        before_request()
+    response = fetch(url, headers=requestheaders, **kwargs)
+    if response.status_code == 304 and entry:
+        if max_age is not None:
+            # record the revalidation, so the entry is fresh again for max_age
+            entry["date"] = time.time()
+            cache.store(key, entry)
+        return _from_entry(entry, response)
+    if response.status_code == 200 and (
+        "ETag" in response.headers or "Last-Modified" in response.headers
+    ):
+        cache.store(key, _to_entry(response))
+    return response
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """Request budget for a single host. The bucket is filled from the rate limit headers the server returns (the
+    remaining number of requests and the time at which the limit resets), and is drained by one token per request."""
+
+    def __init__(self):
+        self.tokens = None  # unknown until the server tells us
+        self.reset = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, max_wait: float) -> float:
+        """Takes a token, waits for the limit to reset if there are none left. Returns the time waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.time()
+                if self.tokens is None or self.tokens > 0:
+                    if self.tokens is not None:
+                        self.tokens -= 1
+                    return waited
+                if now >= self.reset:
+                    # a new window has started, the next response will tell us the new budget
+                    self.tokens = None
+                    continue
+                delay = self.reset - now
+            if waited + delay > max_wait:
+                raise RateLimitExceeded(
+                    f"Rate limit exhausted, it resets in {int(delay)} seconds which is more than we are willing to wait"
+                )
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, remaining: int, reset: float):
+        """Updates the bucket from the rate limit headers of a response"""
+        with self.lock:
+            if reset != self.reset or self.tokens is None:
+                # new window (or first response)
+                self.tokens = remaining
+                self.reset = reset
+            else:
+                # responses to concurrent requests may arrive out of order, keep the most pessimistic count
+                self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """Keeps a token bucket per host, shared by all threads"""
+
+    def __init__(self, max_wait: float = 300):
+        self.max_wait = max_wait
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str, resource: str = "") -> TokenBucket:
+        """Returns the bucket for the host of the URL, a host may have separate limits for different resources (e.g. GitHub's REST and GraphQL APIs)"""
+        key = (urlparse(url).netloc, resource)
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket()
+            return self.buckets[key]
+
+    def acquire(self, url: str, resource: str = "") -> float:
+        return self.bucket(url, resource).acquire(self.max_wait)
+
+    def update(self, url: str, remaining: int, reset: float, resource: str = ""):
+        self.bucket(url, resource).update(remaining, reset)
+
+
+RATELIMITER = RateLimiter()
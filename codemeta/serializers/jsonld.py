@@ -1,10 +1,13 @@
 import sys
 import json
 import os.path
-from typing import Union, IO, Sequence, Optional
+from typing import Union, IO, Sequence, Optional, Iterator
 from rdflib import Graph, URIRef, BNode, Literal
-from rdflib.namespace import SKOS #type: ignore
+from rdflib.namespace import RDF, SKOS #type: ignore
 from copy import copy
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from rdflib.plugins.shared.jsonld.context import Context
 from codemeta.common import (
     AttribDict,
     CODEMETA_SOURCE,
@@ -23,9 +26,16 @@ from codemeta.common import (
     TMPDIR,
     DEVIANT_CONTEXT,
     ORDEREDLIST_PROPERTIES,
+    SDO,
+    iter_subgraph,
+    scratch_graph,
 )
 
 ORDEREDLIST_PROPERTIES_NAMES = list(os.path.basename(x) for x in ORDEREDLIST_PROPERTIES)
+# keys (full or short form) under which we never embed items, as they should remain literals
+PREFER_LITERAL_KEYS = set(str(x) for x in PREFER_LITERAL_PROPERTIES) | set(
+    str(x).split("/")[-1] for x in PREFER_LITERAL_PROPERTIES
+)
 NSPREFIXES = (
     "schema:",
     "codemeta:",
@@ -417,3 +427,167 @@ def serialize_to_jsonld(
 
     assert isinstance(data, dict)
     return data
+
+
+def frame_item(data, itemmap: dict, history: set):
+    """Non-destructive variant of embed_items(): replaces all references with (copies of) items without modifying the itemmap, so the same itemmap can be used to frame many resources. The history prevents circular references."""
+    if isinstance(data, list):
+        return [frame_item(item, itemmap, copy(history)) for item in data]
+    elif isinstance(data, dict):
+        for idkey in ("@id", "id"):
+            if idkey in data and data[idkey] in itemmap and data[idkey] not in history:
+                history.add(data[idkey])
+                return frame_item(itemmap[data[idkey]], itemmap, copy(history))
+        return {
+            k: frame_item(v, itemmap, copy(history))
+            if k not in ("@id", "id") and k not in NOEMBED and k not in PREFER_LITERAL_KEYS
+            else copy(v)
+            for k, v in data.items()
+        }
+    elif (
+        isinstance(data, str)
+        and (
+            data.startswith(("http", "file://", "/", "_"))
+            or data.startswith(NSPREFIXES)
+        )
+        and data in itemmap
+        and data not in history
+    ):  # this is probably a reference even though it's not explicit
+        history.add(data)
+        return frame_item(itemmap[data], itemmap, copy(history))
+    return data
+
+
+def frame_resource(
+    itemmap: dict,
+    roots: set,
+    item_id: str,
+    baseuri: Optional[str] = None,
+    context: Optional[list] = None,
+    encode: bool = False,
+) -> Union[dict, str]:
+    """Frame and clean up a single resource using a (read-only) item map. If a context is passed, it will be included in the result. If encode is set, the result is returned as a JSON string (single line) rather than as a dictionary."""
+    framed = frame_item(itemmap[item_id], itemmap, copy(roots))
+    framed = hide_ordered_lists(framed)
+    framed = sort_by_position(framed)
+    framed = cleanup(framed, baseuri)
+    assert isinstance(framed, dict)
+    if context is not None:
+        framed = {"@context": context, **framed}
+    if encode:
+        return json.dumps(framed, ensure_ascii=False, sort_keys=True)
+    return framed
+
+
+def frame_subgraph(
+    triples: list,
+    item_id: str,
+    context: Context,
+    roots: set,
+    baseuri: Optional[str] = None,
+    outputcontext: Optional[list] = None,
+    includecontext: bool = False,
+    encode: bool = False,
+) -> Union[dict, str]:
+    """Serializes the triples of a single resource (and everything it references) to JSON-LD and frames the resource, see frame_resource()"""
+    subgraph = scratch_graph()
+    subgraph.addN((s, p, o, subgraph) for s, p, o in triples)
+    data = json.loads(subgraph.serialize(format="json-ld", auto_compact=True, context=context))
+    if includecontext:
+        data = expand_implicit_id_nodes(
+            data, [str(x).split("/")[-1] for x in PREFER_URIREF_PROPERTIES]
+        )
+    data.pop("@context", None)
+    itemmap = {}
+    gather_items(data.get("@graph", data), itemmap)
+    return frame_resource(itemmap, roots, item_id, baseuri, outputcontext, encode)
+
+
+# state for framing workers, set once per worker process by init_framing_worker()
+_framing_state = {}
+
+
+def init_framing_worker(contextdata: list, roots: set, baseuri: Optional[str], outputcontext: Optional[list], includecontext: bool, encode: bool):
+    """Initializer for framing worker processes, each parses the context only once"""
+    _framing_state.update(
+        context=Context(contextdata),
+        roots=roots,
+        baseuri=baseuri,
+        outputcontext=outputcontext,
+        includecontext=includecontext,
+        encode=encode,
+    )
+
+
+def frame_subgraph_worker(item_id: str, triples: list) -> Union[dict, str]:
+    return frame_subgraph(
+        triples,
+        item_id,
+        _framing_state["context"],
+        _framing_state["roots"],
+        _framing_state["baseuri"],
+        _framing_state["outputcontext"],
+        _framing_state["includecontext"],
+        _framing_state["encode"],
+    )
+
+
+def serialize_to_jsonld_lines(
+    g: Graph, res: Union[Sequence, URIRef, None], args: AttribDict, encode: bool = False
+) -> Iterator[Union[dict, str]]:
+    """Serializes the RDF graph to line-delimited JSON-LD (one self-contained framed document per SoftwareSourceCode resource, each referencing the same context). Documents are yielded as soon as they are framed, either as dictionaries or, if encode is set, as single-line JSON strings.
+
+    Resources are serialized one at a time, each from the part of the graph reachable from it, so memory use is bounded by the largest resource rather than by the whole graph. References between the resources themselves are kept as references (stand-off).
+    If args.jobs is larger than one, the work is distributed over a pool of worker processes; documents are still yielded in the same deterministic order."""
+    if res and (not isinstance(res, (list, tuple)) or len(res) == 1):
+        if isinstance(res, (list, tuple)):
+            res = res[0]
+        doc = serialize_to_jsonld(g, res, args)
+        yield json.dumps(doc, ensure_ascii=False, sort_keys=True) if encode else doc
+        return
+
+    contextdata = [x[0] for x in init_context(args)] + [DEVIANT_CONTEXT]
+    context = Context(contextdata)
+    outputcontext = rewrite_context(list(contextdata), args.addcontext)
+
+    # the same resources that would be top-level items of the graph, in graph order
+    resources = [
+        s
+        for s in g.subjects(RDF.type, SDO.SoftwareSourceCode, unique=True)
+        if isinstance(s, URIRef) or (isinstance(s, BNode) and (None, None, s) not in g)
+    ]
+    ids = {
+        s: str(context.shrink_iri(s)) if isinstance(s, URIRef) else s.n3()
+        for s in resources
+    }
+    roots = set(ids.values())
+    if isinstance(res, (list, tuple)):
+        selection = set(str(x) for x in res)
+        resources = [s for s in resources if ids[s] in selection or str(s) in selection]
+
+    nodes = set(ids)
+
+    def tasks():
+        for s in resources:
+            # don't descend into the other resources, they remain references
+            yield ids[s], list(iter_subgraph(g, [s], nodes))
+
+    jobs = int(args.jobs) if args.jobs else 1
+    if jobs > 1 and len(resources) > 1:
+        print(f"Framing {len(resources)} resources using {jobs} processes", file=sys.stderr)
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_framing_worker,
+            initargs=(contextdata, roots, args.baseuri, outputcontext, bool(args.includecontext), encode),
+        ) as executor:
+            # only a bounded number of resources is in flight, results are yielded in submission order
+            pending = deque()
+            for item_id, triples in tasks():
+                pending.append(executor.submit(frame_subgraph_worker, item_id, triples))
+                if len(pending) >= jobs * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    else:
+        for item_id, triples in tasks():
+            yield frame_subgraph(triples, item_id, context, roots, args.baseuri, outputcontext, bool(args.includecontext), encode)
@@ -0,0 +1,49 @@
+from typing import Union, IO, Sequence, Optional
+from rdflib import Graph, URIRef, BNode, Literal
+from codemeta.common import iter_reachable
+
+
+def nt_term(term: Union[URIRef, BNode, Literal]) -> str:
+    """Formats a single term in N-Triples syntax"""
+    if isinstance(term, Literal):
+        value = (
+            str(term)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+        if term.language:
+            return f'"{value}"@{term.language}'
+        elif term.datatype:
+            return f'"{value}"^^<{term.datatype}>'
+        return f'"{value}"'
+    return term.n3()
+
+
+def write_ntriples(
+    g: Graph,
+    res: Union[Sequence, URIRef, None],
+    fp: IO,
+    quads: bool = False,
+    subjects: Optional[list] = None,
+) -> int:
+    """Writes the RDF graph (or only the part reachable from the specified resource(s)) as N-Triples (or N-Quads) directly to the given text stream.
+    Subjects may hold the precomputed nodes that are reachable from the resource(s). Returns the number of statements written"""
+    if subjects is None:
+        if res:
+            subjects = iter_reachable(g, res if isinstance(res, (list, tuple)) else [res])
+        else:
+            subjects = g.subjects(unique=True)  # type: ignore
+    if quads and isinstance(g.identifier, URIRef):
+        end = f" <{g.identifier}> .\n"
+    else:
+        # the graph has no name, everything goes into the default graph
+        end = " .\n"
+    count = 0
+    for s in subjects:
+        subject = nt_term(s)  # type: ignore
+        for p, o in g.predicate_objects(s):
+            fp.write(subject + " " + nt_term(p) + " " + nt_term(o) + end)  # type: ignore
+            count += 1
+    return count
@@ -1,19 +1,113 @@
 import sys
 import json
-from codemeta.common import SDO, get_subgraph
-from typing import Union, IO, Sequence
+import re
+from codemeta.common import (
+    SDO,
+    CODEMETA,
+    SOFTWARETYPES,
+    SOFTWAREIODATA,
+    REPOSTATUS,
+    SPDX,
+    get_subgraph,
+    iter_reachable,
+    scratch_graph,
+    bind_like,
+)
+from typing import Union, IO, Sequence, Optional
 from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.namespace import RDF, RDFS, OWL, XSD  # type: ignore
 
+# prefixes used by the streaming writer, they are always declared up front
+STREAM_PREFIXES = tuple(
+    (prefix, str(namespace))
+    for prefix, namespace in (
+        ("schema", SDO),
+        ("codemeta", CODEMETA),
+        ("stype", SOFTWARETYPES),
+        ("iodata", SOFTWAREIODATA),
+        ("repostatus", REPOSTATUS),
+        ("spdx", SPDX),
+        ("rdf", RDF),
+        ("rdfs", RDFS),
+        ("owl", OWL),
+        ("xsd", XSD),
+    )
+)
 
-def serialize_to_turtle(g: Graph, res: Union[Sequence, URIRef, None]) -> str:
-    """Serializes the RDF graph to Turtle"""
-    if res:
+# conservative subset of what turtle allows as the local part of a prefixed name
+LOCALNAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_\-]*$")
+
+
+def serialize_to_turtle(
+    g: Graph, res: Union[Sequence, URIRef, None], subjects: Optional[list] = None
+) -> str:
+    """Serializes the RDF graph to Turtle. Subjects may hold the precomputed nodes that are reachable from the resource(s)."""
+    if subjects is not None:
+        subgraph = scratch_graph()
+        subgraph.addN((s, p, o, subgraph) for s in subjects for p, o in g.predicate_objects(s))
+        bind_like(subgraph, g)
+        g = subgraph
+    elif res:
         # Get the subgraph that focusses on this specific resource (may be multiple)
         # TODO: this may not work well with ordered lists yet!!
         if isinstance(res, (list, tuple)):
-            g = get_subgraph(g, res)
+            subgraph = get_subgraph(g, res)
         else:
-            g = get_subgraph(g, [res])
+            subgraph = get_subgraph(g, [res])
+        bind_like(subgraph, g)
+        g = subgraph
 
     g.bind("sdo", SDO)
     return g.serialize(format="turtle", auto_compact=True)
+
+
+def turtle_term(term: Union[URIRef, BNode, Literal]) -> str:
+    """Formats a single term in Turtle syntax, using the prefixes of the streaming writer where possible"""
+    if isinstance(term, URIRef):
+        if term == RDF.type:
+            return "a"
+        for prefix, namespace in STREAM_PREFIXES:
+            if term.startswith(namespace):
+                localname = term[len(namespace) :]
+                if LOCALNAME.match(localname):
+                    return prefix + ":" + localname
+    return term.n3()
+
+
+def write_turtle(
+    g: Graph,
+    res: Union[Sequence, URIRef, None],
+    fp: IO,
+    subjects: Optional[list] = None,
+) -> int:
+    """Writes the RDF graph (or only the part reachable from the specified resource(s)) as Turtle directly to the given text stream.
+    Unlike serialize_to_turtle(), this does not copy the graph nor analyse it as a whole first, it simply groups the statements by subject as it walks the graph.
+    Subjects may hold the precomputed nodes that are reachable from the resource(s). Returns the number of statements written."""
+    for prefix, namespace in STREAM_PREFIXES:
+        fp.write(f"@prefix {prefix}: <{namespace}> .\n")
+    if subjects is None:
+        if res:
+            subjects = iter_reachable(g, res if isinstance(res, (list, tuple)) else [res])
+        else:
+            subjects = g.subjects(unique=True)  # type: ignore
+    count = 0
+    for s in subjects:
+        # rdf:type first, for readability
+        statements = sorted(
+            g.predicate_objects(s), key=lambda x: (x[0] != RDF.type, x[0])
+        )
+        if not statements:
+            continue
+        fp.write("\n" + turtle_term(s))  # type: ignore
+        previous = None
+        for p, o in statements:
+            if p == previous:
+                fp.write(" ,\n        " + turtle_term(o))  # type: ignore
+            else:
+                if previous is not None:
+                    fp.write(" ;")
+                fp.write("\n    " + turtle_term(p) + " " + turtle_term(o))  # type: ignore
+            previous = p
+            count += 1
+        fp.write(" .\n")
+    return count
@@ -0,0 +1,51 @@
+"""Interned RDF terms. rdflib's Namespace constructs a new URIRef on every attribute access and identical literals are
+constructed anew for every node that carries them, which adds up in large graphs. The terms in this module are constructed
+once and shared."""
+
+import sys
+from functools import lru_cache
+from typing import Optional, Union
+from rdflib import Namespace, URIRef, Literal
+
+
+class InternedNamespace(Namespace):
+    """A Namespace that returns the same URIRef instance every time a term is requested"""
+
+    def __new__(cls, value: Union[str, bytes]) -> "InternedNamespace":
+        namespace = super().__new__(cls, value)
+        namespace._terms = {}  # type: ignore
+        return namespace  # type: ignore
+
+    def term(self, name: str) -> URIRef:
+        if not isinstance(name, str):
+            return super().term(name)
+        term = self._terms.get(name)  # type: ignore
+        if term is None:
+            term = self._terms[name] = URIRef(str(self) + name)  # type: ignore
+        return term
+
+    def __getattr__(self, name: str) -> URIRef:
+        if name.startswith("__"):  # ignore any special Python names!
+            raise AttributeError
+        term = self.term(name)
+        # store as instance attribute, so the next access no longer goes through __getattr__ at all
+        self.__dict__[name] = term
+        return term
+
+
+SDO = InternedNamespace("http://schema.org/")
+CODEMETA = InternedNamespace("https://codemeta.github.io/terms/")
+# Custom extensions not in codemeta/schema.org (yet), they are initially proposed in https://github.com/codemeta/codemeta/issues/271
+SOFTWARETYPES = InternedNamespace("https://w3id.org/software-types#")  # See https://github.com/SoftwareUnderstanding/software_types
+SOFTWAREIODATA = InternedNamespace("https://w3id.org/software-iodata#")  # See https://github.com/SoftwareUnderstanding/software-iodata
+
+
+@lru_cache(maxsize=65536, typed=True)
+def intern_literal(value, lang: Optional[str] = None, datatype: Optional[str] = None) -> Literal:
+    """Returns a shared Literal instance for the value, use this for values that recur on many nodes"""
+    return Literal(value, lang=lang, datatype=datatype)
+
+
+# runtime platforms, added to every python package and dependency
+PYTHON3 = intern_literal("Python 3")
+PYTHON_EXACT = intern_literal("Python " + ".".join(str(x) for x in sys.version_info[:3]))
@@ -8,6 +8,7 @@ from codemeta.common import (
     AttribDict,
     SDO,
     generate_uri,
+    get_resource_view,
 )
 
 from pyshacl import validate as pyshacl_validate
@@ -56,10 +57,11 @@ def validate(
             Literal(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
         )
     )
-    name = g.value(res, SDO.name)
+    view = get_resource_view(g, res)
+    name = view.value(SDO.name)
     if not name:
         name = "unnamed software"
-    version = g.value(res, SDO.version)
+    version = view.value(SDO.version)
     if not version:
         version = "(unknown version)"
     g.add(
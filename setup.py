@@ -40,7 +40,7 @@ setup(
     ],
     zip_safe=False,
     include_package_data=True,
-    package_data = { 'codemeta': ['schema/crosswalk.csv', 'schema/codemeta.jsonld', 'templates/*.html','resources/*.css', 'resources/fa-*' ] },
+    package_data = { 'codemeta': ['schema/crosswalk.csv', 'schema/codemeta.jsonld', 'templates/*.html','resources/*.css', 'resources/*.json', 'resources/fa-*' ] },
     install_requires=[ 'nameparser','importlib_metadata','BeautifulSoup4', 'rdflib >= 7.1.1','pyshacl >= 0.31.0', 'requests','lxml','pyyaml','pep517','tomlkit','pyproject_parser', 'setuptools'],
     entry_points = {    'console_scripts': [ 'codemetapy = codemeta.codemeta:main' ] },
     cmdclass=cmdclass
@@ -2,12 +2,33 @@
 
 import sys
 import os
+import io
+import contextlib
 import unittest
 import json
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
 from rdflib import Graph, BNode, URIRef, Literal
 from rdflib.namespace import RDF, OWL
-from codemeta.common import CODEMETA, SDO, AttribDict, SOFTWARETYPES, SOFTWAREIODATA, iter_ordered_list, SCHEMA_SOURCE, CODEMETA_SOURCE
-from codemeta.codemeta import build, serialize
+from codemeta.common import CODEMETA, SDO, AttribDict, SOFTWARETYPES, SOFTWAREIODATA, iter_ordered_list, SCHEMA_SOURCE, CODEMETA_SOURCE, get_subgraph, add_to_ordered_list, add_authors, remap_uris, license_to_spdx, interface_clues, process_resources, get_resource_view, touch_graph, compose, get_graph_index, LayeredStore
+from codemeta.codemeta import build, serialize, read
+from codemeta.remote import cached_get, cache_key, ResponseCache, TokenBucket, RateLimitExceeded, RATELIMITER, fetch, fetch_report, FetchPolicy, ResponseTooLarge, CircuitOpen, Cassette, CassetteMiss
+import codemeta.remote
+import codemeta.parsers.gitapi
+from codemeta.parsers.web import parse_web, parse_web_graph, discover_service_urls, add_service_metadata, JSONLDScanner, JSONLD_SCRIPT
+
+def network_args(name: str) -> dict:
+    """Extra build() arguments for tests that query remote services. Set CODEMETAPY_TEST_CASSETTES=record to record their
+    requests to a cassette in cassettes/NAME, and CODEMETAPY_TEST_CASSETTES=replay to run them offline from it."""
+    mode = os.environ.get("CODEMETAPY_TEST_CASSETTES")
+    if mode in ("record", "replay"):
+        return { mode: os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes", name) }
+    return {}
 
 def debugout(g: Graph, s,p=None,o=None):
     print("DEBUG OUTPUT:", file=sys.stderr)
@@ -164,6 +185,24 @@ class BuildTest_Json(unittest.TestCase):
         """Test json serialisation"""
         serialize(self.g, self.res, AttribDict({ "output": "ttl" }), self.contextgraph)
 
+    def test101_serialisation_streaming(self):
+        """Test streaming turtle and n-triples serialisation"""
+        ttl = serialize(self.g, self.res, AttribDict({ "output": "turtle-stream" }), self.contextgraph)
+        nt = serialize(self.g, self.res, AttribDict({ "output": "ntriples" }), self.contextgraph)
+        g_ttl = Graph()
+        g_ttl.parse(data=ttl, format="turtle")
+        g_nt = Graph()
+        g_nt.parse(data=nt, format="nt")
+        self.assertEqual(len(g_ttl), len(g_nt), "Testing whether both serialisations are equal in size")
+        self.assertIn( (self.res, SDO.name, Literal("Frog")), g_nt)
+        self.assertIn( (self.res, SDO.license, URIRef("http://spdx.org/licenses/GPL-3.0-only")), g_ttl)
+
+    def test102_serialisation_multiple(self):
+        """Test multiple serialisations from the same build"""
+        s = serialize(self.g, self.res, AttribDict({}), self.contextgraph, outputs=[("ntriples", None), ("turtle", None)])
+        self.assertIn("<http://schema.org/name> \"Frog\" .", s)
+        self.assertIn("@prefix", s)
+
 
 class BuildTest2_Json(BuildTest_Json):
     """Build codemeta.json from existing codemeta.json (basically a parse, validation/reconciliation and reserialisation), codemeta 2 version"""
@@ -236,7 +275,7 @@ class BuildTest_GithubAPI(unittest.TestCase):
     def setUp(self):
         #relies on automatically guessing the type
         #deliberately picked software that is end-of-life and will not change much anymore
-        self.g, self.res, self.args, self.contextgraph = build(inputsources=["https://github.com/proycon/labirinto"])
+        self.g, self.res, self.args, self.contextgraph = build(inputsources=["https://github.com/proycon/labirinto"], **network_args("github_api"))
 
     def test001_api(self):
         """Testing github API response"""
@@ -319,7 +358,7 @@ class BuildTest_Web_HTML(unittest.TestCase):
 
     def setUp(self):
         #relies on automatically guessing the type
-        self.g, self.res, self.args, self.contextgraph = build(inputsources=["https://shebanq.ancient-data.org/"], with_stypes=True)
+        self.g, self.res, self.args, self.contextgraph = build(inputsources=["https://shebanq.ancient-data.org/"], with_stypes=True, **network_args("web_html"))
 
     def test001(self):
         """Testing basic properties"""
@@ -341,7 +380,7 @@ class BuildTest_Web_JSONLD(unittest.TestCase):
 
     def setUp(self):
         #relies on automatically guessing the type
-        self.g, self.res, self.args, self.contextgraph = build(inputsources=["https://www.delpher.nl/"], with_stypes=True)
+        self.g, self.res, self.args, self.contextgraph = build(inputsources=["https://www.delpher.nl/"], with_stypes=True, **network_args("web_jsonld"))
 
     def test001(self):
         """Testing basic properties"""
@@ -511,6 +550,838 @@ class BuildTest_RustCargoToml(unittest.TestCase):
         serialize(self.g, self.res, AttribDict({ "output": "ttl" }), self.contextgraph)
 
 
+class SubgraphTest(unittest.TestCase):
+    """Extraction of the reachable subgraph"""
+
+    def test001_deep(self):
+        """Testing a dependency chain deeper than the recursion limit"""
+        g = Graph()
+        depth = sys.getrecursionlimit() + 100
+        for i in range(depth):
+            g.add((URIRef(f"http://example.org/{i}"), SDO.softwareRequirements, URIRef(f"http://example.org/{i+1}")))
+        g.add((URIRef(f"http://example.org/{depth}"), SDO.name, Literal("last")))
+        g.add((URIRef("http://example.org/unrelated"), SDO.name, Literal("unrelated")))
+        subgraph = get_subgraph(g, [URIRef("http://example.org/0")])
+        self.assertEqual(len(subgraph), depth + 1)
+        self.assertIn( (URIRef(f"http://example.org/{depth}"), SDO.name, Literal("last")), subgraph)
+        self.assertNotIn( (URIRef("http://example.org/unrelated"), SDO.name, None), subgraph)
+
+
+class OrderedListTest(unittest.TestCase):
+    """Appending to ordered lists"""
+
+    def test001_append(self):
+        """Testing appending, deduplication and external modification of an ordered list"""
+        g = Graph()
+        subject = URIRef("http://example.org/software")
+        for i in range(10):
+            person = URIRef(f"http://example.org/person{i}")
+            g.add((person, SDO.name, Literal(f"Person {i}")))
+            self.assertTrue(add_to_ordered_list(g, subject, SDO.author, person))
+        self.assertFalse(add_to_ordered_list(g, subject, SDO.author, URIRef("http://example.org/person3")), "duplicate by identity")
+        g.add((URIRef("http://example.org/other"), SDO.name, Literal("Person 5")))
+        self.assertFalse(add_to_ordered_list(g, subject, SDO.author, URIRef("http://example.org/other")), "duplicate by name")
+        #remove the list behind the index's back and start a new one
+        g.remove((subject, SDO.author, None))
+        self.assertTrue(add_to_ordered_list(g, subject, SDO.author, URIRef("http://example.org/person3")))
+        self.assertTrue(add_to_ordered_list(g, subject, SDO.author, URIRef("http://example.org/person4")))
+        self.assertEqual([ o for _,_,o in iter_ordered_list(g, subject, SDO.author) ], [URIRef("http://example.org/person3"), URIRef("http://example.org/person4")])
+
+    def test002_remap(self):
+        """Testing that a remapped member is still recognised as a duplicate"""
+        g = Graph()
+        subject = URIRef("http://example.org/software")
+        a, b, c = (URIRef(f"http://example.org/{x}") for x in "abc")
+        for person in (a, b, c):
+            self.assertTrue(add_to_ordered_list(g, subject, SDO.author, person))
+        remap_uris(g, { a: URIRef("http://example.org/a2") })
+        self.assertFalse(add_to_ordered_list(g, subject, SDO.author, URIRef("http://example.org/a2")))
+        self.assertEqual([ o for _,_,o in iter_ordered_list(g, subject, SDO.author) ], [URIRef("http://example.org/a2"), b, c])
+
+    def test003_late_identity(self):
+        """Testing that identifying properties set after a member was added are taken into account"""
+        g = Graph()
+        subject = URIRef("http://example.org/software")
+        a, b, other = (URIRef(f"http://example.org/{x}") for x in ("a", "b", "other"))
+        self.assertTrue(add_to_ordered_list(g, subject, SDO.author, a))
+        self.assertTrue(add_to_ordered_list(g, subject, SDO.author, b))
+        g.add((a, SDO.name, Literal("Alice")))
+        g.add((other, SDO.name, Literal("Alice")))
+        self.assertFalse(add_to_ordered_list(g, subject, SDO.author, other))
+
+
+class AuthorsTest(unittest.TestCase):
+    """Adding authors without duplicates"""
+
+    def test001_skip_duplicates(self):
+        """Testing duplicate detection by name and e-mail address"""
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        self.assertEqual(len(add_authors(g, res, "Maarten van Gompel <proycon@anaproy.nl>", single_author=True, skip_duplicates=True)), 1)
+        self.assertEqual(len(add_authors(g, res, "maarten  van gompel", single_author=True, skip_duplicates=True)), 0, "duplicate by name")
+        self.assertEqual(len(add_authors(g, res, "Someone Else <proycon@anaproy.nl>", single_author=True, skip_duplicates=True)), 0, "duplicate by mail")
+        self.assertEqual(len(add_authors(g, res, 'Dwayne "The Rock" Johnson', single_author=True, skip_duplicates=True)), 1, "quotes in names")
+        g.add((URIRef("http://example.org/jane"), RDF.type, SDO.Person))
+        g.add((URIRef("http://example.org/jane"), SDO.givenName, Literal("Jane")))
+        g.add((URIRef("http://example.org/jane"), SDO.familyName, Literal("Doe")))
+        self.assertEqual(len(add_authors(g, res, "Jane Doe", single_author=True, skip_duplicates=True)), 0, "added by other means")
+        self.assertEqual(len(list(iter_ordered_list(g, res, SDO.author))), 2)
+
+    def test002_mail_per_type(self):
+        """Testing that an organization sharing an e-mail address does not hide a person with it"""
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        org = URIRef("http://example.org/org")
+        g.add((org, RDF.type, SDO.Organization))
+        g.add((org, SDO.name, Literal("Org")))
+        g.add((org, SDO.email, Literal("a@b.c")))
+        self.assertEqual(len(add_authors(g, res, "John Doe", single_author=True, skip_duplicates=True)), 1)
+        person = URIRef("http://example.org/person")
+        g.add((person, RDF.type, SDO.Person))
+        g.add((person, SDO.name, Literal("Person")))
+        g.add((person, SDO.email, Literal("a@b.c")))
+        self.assertEqual(len(add_authors(g, res, "Someone Else <a@b.c>", single_author=True, skip_duplicates=True)), 0, "duplicate by mail")
+
+    def test003_stale_entry(self):
+        """Testing that a removed node is replaced by another node with the same key"""
+        g = Graph()
+        first, second = URIRef("http://example.org/first"), URIRef("http://example.org/second")
+        for node, name in ((first, "First"), (second, "Second")):
+            g.add((node, RDF.type, SDO.Person))
+            g.add((node, SDO.givenName, Literal(name)))
+            g.add((node, SDO.familyName, Literal("Doe")))
+            g.add((node, SDO.email, Literal("A@b.c")))
+        identities = get_graph_index(g).identities(g)
+        self.assertEqual(identities.find_mail(g, "a@b.c"), first)
+        g.remove((first, None, None))
+        self.assertEqual(identities.find_mail(g, "a@b.c"), second)
+        self.assertIsNone(identities.find_mail(g, "a@b.c", SDO.Organization))
+
+
+class RemapTest(unittest.TestCase):
+    """Remapping URIs"""
+
+    def test001_remap_uris(self):
+        """Testing remapping multiple URIs in one pass"""
+        g = Graph()
+        a, b, c = URIRef("http://example.org/a"), URIRef("http://example.org/b"), URIRef("http://example.org/c")
+        g.add((a, SDO.softwareRequirements, b))
+        g.add((b, SDO.softwareRequirements, a))
+        g.add((b, SDO.isPartOf, b))
+        g.add((c, SDO.name, Literal("c")))
+        remap_uris(g, { a: "http://example.org/x", b: URIRef("http://example.org/y") })
+        x, y = URIRef("http://example.org/x"), URIRef("http://example.org/y")
+        self.assertEqual(len(g), 4)
+        self.assertIn((x, SDO.softwareRequirements, y), g)
+        self.assertIn((y, SDO.softwareRequirements, x), g)
+        self.assertIn((y, SDO.isPartOf, y), g)
+        self.assertNotIn((a, None, None), g)
+        self.assertNotIn((None, None, b), g)
+
+
+class ComposeTest(unittest.TestCase):
+    """Composition of metadata from multiple sources"""
+
+    def setUp(self):
+        self.res = URIRef("http://example.org/software")
+        self.g = Graph()
+        self.newgraph = Graph()
+
+    def test001_replace_multivalued(self):
+        """Testing that all old values of a property are replaced by the new ones, values in both are kept"""
+        for keyword in ("a", "b", "c"):
+            self.g.add((self.res, SDO.keywords, Literal(keyword)))
+        for keyword in ("b", "d", "e"):
+            self.newgraph.add((self.res, SDO.keywords, Literal(keyword)))
+        self.g.add((self.res, SDO.name, Literal("Old")))
+        self.newgraph.add((self.res, SDO.description, Literal("New")))
+        compose(self.g, self.newgraph, self.res, AttribDict({}))
+        self.assertEqual(sorted(str(o) for o in self.g.objects(self.res, SDO.keywords)), ["b", "d", "e"])
+        self.assertIn((self.res, SDO.name, Literal("Old")), self.g, "properties not in the new graph are untouched")
+        self.assertIn((self.res, SDO.description, Literal("New")), self.g)
+
+    def test002_development_status(self):
+        """Testing that a development status from another vocabulary does not replace the old one, one from the same vocabulary does"""
+        trl = URIRef("https://w3id.org/research-technology-readiness-levels#Stage4")
+        self.g.add((self.res, CODEMETA.developmentStatus, URIRef("https://www.repostatus.org/#wip")))
+        self.newgraph.add((self.res, CODEMETA.developmentStatus, trl))
+        compose(self.g, self.newgraph, self.res, AttribDict({}))
+        self.assertEqual(set(self.g.objects(self.res, CODEMETA.developmentStatus)), { URIRef("https://www.repostatus.org/#wip"), trl })
+        newgraph = Graph()
+        newgraph.add((self.res, CODEMETA.developmentStatus, URIRef("https://www.repostatus.org/#active")))
+        compose(self.g, newgraph, self.res, AttribDict({}))
+        self.assertEqual(set(self.g.objects(self.res, CODEMETA.developmentStatus)), { URIRef("https://www.repostatus.org/#active"), trl })
+
+
+class LayeredComposeTest(ComposeTest):
+    """Composition of metadata from multiple sources in layers, as build() does"""
+
+    def setUp(self):
+        super().setUp()
+        self.g = Graph(store=LayeredStore())
+
+    def test003_layers(self):
+        """Testing that sources are not copied, and that direct changes apply on top of the layers"""
+        self.g.add((self.res, SDO.name, Literal("Old")))
+        self.g.add((self.res, SDO.version, Literal("1.0")))
+        self.newgraph.add((self.res, SDO.name, Literal("New")))
+        self.newgraph.add((self.res, SDO.keywords, Literal("a")))
+        compose(self.g, self.newgraph, self.res, AttribDict({}))
+        self.assertEqual(len(self.g.store.base), 2, "the new graph is not copied")
+        self.assertEqual(set(self.g.objects(self.res, SDO.name)), { Literal("New") })
+        self.assertEqual(len(self.g), 3)
+        self.assertEqual(len(list(self.g)), 3)
+        self.g.add((self.res, SDO.name, Literal("Old")))
+        self.assertEqual(set(self.g.objects(self.res, SDO.name)), { Literal("New"), Literal("Old") }, "added after the composition")
+        self.g.set((self.res, SDO.keywords, Literal("b")))
+        self.assertEqual(set(self.g.objects(self.res, SDO.keywords)), { Literal("b") })
+        self.g.remove((self.res, SDO.name, None))
+        self.assertNotIn((self.res, SDO.name, None), self.g)
+        self.assertEqual(len(self.g), 2)
+
+
+class LicenseTest(unittest.TestCase):
+    """Conversion of licenses to SPDX"""
+
+    def test001_first_match(self):
+        """Testing that the first matching entry of the license map wins, regardless of its position in the text"""
+        self.assertEqual(license_to_spdx("GNU General Public License v3 or later (GPLv3+)"), "http://spdx.org/licenses/GPL-3.0-or-later")
+        self.assertEqual(license_to_spdx("MIT or GPL-3.0"), "http://spdx.org/licenses/GPL-3.0-only")
+        self.assertEqual(license_to_spdx(["BSD License", "MIT"]), ["http://spdx.org/licenses/BSD-3-Clause", "http://spdx.org/licenses/MIT"])
+
+    def test002_spdx_identifier(self):
+        """Testing exact SPDX identifiers that are not in the license map"""
+        self.assertEqual(license_to_spdx("zlib"), "http://spdx.org/licenses/Zlib")
+        self.assertEqual(license_to_spdx("Some custom license"), "Some custom license")
+
+    def test003_deprecated_identifier(self):
+        """Testing that deprecated SPDX identifiers are not resolved through the bundled list"""
+        self.assertEqual(license_to_spdx("wxWindows"), "wxWindows")
+        self.assertEqual(license_to_spdx("eCos-2.0"), "eCos-2.0")
+        self.assertEqual(license_to_spdx("bzip2-1.0.6"), "http://spdx.org/licenses/bzip2-1.0.6")
+
+
+class InterfaceCluesTest(unittest.TestCase):
+    """Counting clues for interface types"""
+
+    def test001_clues(self):
+        """Testing that all (overlapping) clues in all texts are counted"""
+        counter = interface_clues(["A Web Application and web api", "command-line tool", "graphical user interface (GUI)"])
+        self.assertEqual(counter[SDO.WebApplication], 1)
+        self.assertEqual(counter[SDO.WebAPI], 1)
+        self.assertEqual(counter[SOFTWARETYPES.CommandLineApplication], 1)
+        self.assertEqual(counter[SOFTWARETYPES.DesktopApplication], 1)
+        self.assertEqual(counter[SOFTWARETYPES.SoftwareLibrary], 0)
+
+
+class BatchEnrichTest(unittest.TestCase):
+    """Correction, reconciliation and enrichment of many resources in one go"""
+
+    def test001_enrich(self):
+        """Testing enrichment of multiple resources with shared dependencies and authors"""
+        g = Graph()
+        person = URIRef("http://example.org/person")
+        g.add((person, RDF.type, SDO.Person))
+        g.add((person, SDO.affiliation, URIRef("http://example.org/org")))
+        dep = URIRef("http://example.org/flask")
+        g.add((dep, SDO.name, Literal("Flask")))
+        resources = []
+        for i in range(3):
+            res = URIRef(f"http://example.org/software{i}")
+            g.add((res, RDF.type, SDO.SoftwareSourceCode))
+            g.add((res, SDO.name, Literal(f"software{i}")))
+            g.add((res, SDO.runtimePlatform, Literal("Python 3")))
+            g.add((res, SDO.softwareRequirements, dep))
+            add_to_ordered_list(g, res, SDO.author, person)
+            resources.append(res)
+        process_resources(g, resources, AttribDict({}), True)
+        for res in resources:
+            self.assertIn((res, SDO.programmingLanguage, Literal("Python")), g)
+            self.assertIn((res, SDO.maintainer, person), g)
+            self.assertIn((res, SDO.producer, URIRef("http://example.org/org")), g)
+            targetproduct = g.value(res, CODEMETA.isSourceCodeOf)
+            self.assertIn((targetproduct, RDF.type, SOFTWARETYPES.WebApplication), g)
+
+
+class ResourceViewTest(unittest.TestCase):
+    """Cached views on the properties of a resource"""
+
+    def test001_invalidation(self):
+        """Testing that the view is refreshed after the graph changes"""
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        g.add((res, SDO.name, Literal("software")))
+        view = get_resource_view(g, res)
+        self.assertIs(view, get_resource_view(g, res))
+        self.assertEqual(view.identifier, str(res))
+        self.assertEqual(view.value(SDO.name), Literal("software"))
+        g.add((res, SDO.identifier, Literal("sw")))
+        self.assertEqual(view.identifier, "sw")
+        g.set((res, SDO.name, Literal("renamed")))
+        touch_graph(g)
+        self.assertEqual(view.objects(SDO.name), (Literal("renamed"),))
+
+    def test002_same_size(self):
+        """Testing that the view is refreshed after changes that leave the size of the graph unchanged"""
+        for g in (Graph(), Graph(store=LayeredStore())):
+            res = URIRef("http://example.org/software")
+            g.add((res, SDO.name, Literal("software")))
+            view = get_resource_view(g, res)
+            self.assertEqual(view.value(SDO.name), Literal("software"))
+            g.set((res, SDO.name, Literal("renamed")))
+            self.assertEqual(view.value(SDO.name), Literal("renamed"))
+            g.remove((res, SDO.name, None))
+            g.add((res, SDO.name, Literal("again")))
+            self.assertEqual(view.objects(SDO.name), (Literal("again"),))
+
+    def test003_copy(self):
+        """Testing that callers can not modify the view"""
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        g.add((res, SDO.keywords, Literal("a")))
+        view = get_resource_view(g, res)
+        keywords = list(view.objects(SDO.keywords))
+        keywords.append(Literal("b"))
+        self.assertEqual(view.objects(SDO.keywords), (Literal("a"),))
+
+
+class TermsTest(unittest.TestCase):
+    """Interned terms"""
+
+    def test001_interned(self):
+        """Testing that terms and literals are shared instances"""
+        from codemeta.terms import intern_literal
+        self.assertIs(SDO.author, SDO.author)
+        self.assertIs(SDO["author"], SDO.author)
+        self.assertEqual(SDO.author, URIRef("http://schema.org/author"))
+        self.assertIs(intern_literal("Python 3"), intern_literal("Python 3"))
+        self.assertEqual(intern_literal(1).datatype, Literal(1).datatype)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves canned responses for the paths in server.routes (json data, or bytes which are served as html), honouring If-None-Match"""
+
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path not in self.server.routes:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.routes[self.path]
+        contenttype = "text/html; charset=utf-8" if isinstance(body, bytes) else "application/json; charset=utf-8"
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        etag = '"' + str(hash(body)) + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", contenttype)
+        self.send_header("ETag", etag)
+        for name, value in self.server.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.server.trickle:
+            #send one byte at a time, like a slow or hostile server
+            for i in range(len(body)):
+                self.wfile.write(body[i:i+1])
+                self.wfile.flush()
+                time.sleep(self.server.trickle)
+        else:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        self.server.posted.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(routes: dict) -> ThreadingHTTPServer:
+    """Starts a local HTTP server in the background, serving the routes (path => json data)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.routes = routes
+    server.hits = []
+    server.headers = {}
+    server.posted = []
+    server.trickle = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class RemoteCacheTest(unittest.TestCase):
+    """Cached HTTP requests with conditional revalidation"""
+
+    def setUp(self):
+        self.server = start_stub_server({ "/repos/x": { "name": "x" } })
+        self.url = f"http://127.0.0.1:{self.server.server_port}/repos/x"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmpdir.name)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test001_revalidate(self):
+        """Testing that a cached response is revalidated and served on 304"""
+        r = cached_get(self.url, cache=self.cache)
+        self.assertEqual(r.json(), { "name": "x" })
+        r = cached_get(self.url, cache=self.cache)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json(), { "name": "x" })
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test002_changed(self):
+        """Testing that a changed resource is refetched"""
+        cached_get(self.url, cache=self.cache)
+        self.server.routes["/repos/x"] = { "name": "y" }
+        self.assertEqual(cached_get(self.url, cache=self.cache).json(), { "name": "y" })
+
+    def test003_identity(self):
+        """Testing that responses are cached per token"""
+        self.assertNotEqual(cache_key(self.url), cache_key(self.url, { "Authorization": "token secret" }))
+        self.assertEqual(cache_key(self.url, { "Accept": "application/json" }), cache_key(self.url))
+
+    def test004_max_age(self):
+        """Testing that a fresh cached response is served without a request"""
+        cached_get(self.url, cache=self.cache, max_age=60)
+        self.assertEqual(cached_get(self.url, cache=self.cache, max_age=60).json(), { "name": "x" })
+        self.assertEqual(len(self.server.hits), 1)
+        cached_get(self.url, cache=self.cache, max_age=0)
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test005_before_request(self):
+        """Testing that the hook for actual requests (e.g. rate limiting) is not called for responses served from the cache"""
+        calls = []
+        cached_get(self.url, cache=self.cache, max_age=60, before_request=lambda: calls.append(1))
+        cached_get(self.url, cache=self.cache, max_age=60, before_request=lambda: calls.append(1))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(self.server.hits), 1)
+
+    def test006_private(self):
+        """Testing that the cache is only accessible to the current user"""
+        self.cache.directory = os.path.join(self.tmpdir.name, "cache")
+        cached_get(self.url, cache=self.cache)
+        self.assertEqual(os.stat(self.cache.directory).st_mode & 0o777, 0o700)
+        for filename in os.listdir(self.cache.directory):
+            self.assertEqual(os.stat(os.path.join(self.cache.directory, filename)).st_mode & 0o777, 0o600)
+
+
+class FetchPolicyTest(unittest.TestCase):
+    """Limits on remote fetches"""
+
+    def test001_max_size(self):
+        """Testing that responses exceeding the maximum size are aborted"""
+        server = start_stub_server({ "/large": "x" * 100000 })
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/large"
+            self.assertEqual(len(fetch(url).content), 100002)
+            self.assertRaises(ResponseTooLarge, fetch, url, policy=FetchPolicy(max_size=1000))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test002_total_timeout(self):
+        """Testing that the total timeout holds against a server that trickles bytes"""
+        server = start_stub_server({ "/slow": "x" * 40 })
+        server.trickle = 0.2
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/slow"
+            begintime = time.monotonic()
+            self.assertRaises(requests.Timeout, fetch, url, policy=FetchPolicy(read_timeout=1, total_timeout=1))
+            self.assertLess(time.monotonic() - begintime, 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test003_circuit_breaker(self):
+        """Testing that a host that fails repeatedly is no longer contacted"""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            url = f"http://127.0.0.1:{s.getsockname()[1]}/" #nothing listens here
+        policy = FetchPolicy(failure_threshold=2, cooldown=60)
+        for _ in range(2):
+            self.assertRaises(requests.ConnectionError, fetch, url, policy=policy)
+        self.assertRaises(CircuitOpen, fetch, url, policy=policy)
+        self.assertIn("failed", fetch_report())
+
+
+class WebHTMLTest(unittest.TestCase):
+    """Bounded extraction of metadata from web pages"""
+
+    def setUp(self):
+        body = b"<p>" + b"lorem ipsum " * 100000 + b"</p>"
+        self.server = start_stub_server({
+            "/jsonld": b'<html><head><title>Test</title><script type="application/ld+json">{"name": "Test"}</script></head><body>' + body + b"</body></html>",
+            "/meta": b'<html><head><title>Test</title><meta name="description" content="A test"><meta name="keywords" content="a, b"></head><body>' + body + b"</body></html>",
+        })
+        self.baseurl = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test001_stop_early(self):
+        """Testing that reading stops after the JSON-LD block"""
+        r = fetch(self.baseurl + "/jsonld", until=JSONLDScanner())
+        self.assertLess(len(r.content), 200000)
+        self.assertEqual(JSONLD_SCRIPT.search(r.text).group(1), '{"name": "Test"}')
+
+    def test002_head(self):
+        """Testing metadata extraction from the head"""
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        targetres = next(parse_web(g, res, self.baseurl + "/meta", AttribDict({ "with_stypes": True })))
+        self.assertIn((targetres, RDF.type, SDO.WebApplication), g)
+        self.assertIn((targetres, SDO.name, Literal("Test")), g)
+        self.assertIn((targetres, SDO.description, Literal("A test")), g)
+        self.assertIn((targetres, SDO.keywords, Literal("b")), g)
+
+    def test003_discover(self):
+        """Testing discovery of service URLs and parsing them into separate graphs"""
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        service = URIRef("http://example.org/service")
+        g.add((res, CODEMETA.isSourceCodeOf, service))
+        g.add((service, SDO.url, Literal(self.baseurl + "/meta")))
+        g.add((service, SDO.serviceUrl, Literal("mailto:nobody@example.org")))
+        discovered = discover_service_urls(g, res)
+        self.assertEqual(discovered, [(service, self.baseurl + "/meta")])
+        newgraph, targets = parse_web_graph(res, discovered[0][1], AttribDict({ "with_stypes": True }))
+        self.assertEqual(len(targets), 1)
+        self.assertIn((targets[0], SDO.description, Literal("A test")), newgraph)
+        self.assertEqual(len(g), 3)
+
+    def test004_add_service_metadata(self):
+        """Testing that services sharing a page each get its metadata, without duplicates from multiple targets"""
+        newgraph = Graph()
+        targets = [ BNode(), BNode() ]
+        for i, target in enumerate(targets):
+            newgraph.add((target, RDF.type, SDO.WebApplication))
+            newgraph.add((target, SDO.name, Literal(f"Service {i}")))
+        newgraph.add((targets[1], SDO.description, Literal("Second")))
+        g = Graph()
+        services = [ URIRef("http://example.org/service1"), URIRef("http://example.org/service2") ]
+        g.add((services[1], SDO.name, Literal("Known")))
+        size = len(newgraph)
+        for service in services:
+            add_service_metadata(g, service, newgraph, targets + [None])
+        self.assertEqual(len(newgraph), size, "the shared graph is not changed")
+        self.assertEqual(list(g.objects(services[0], SDO.name)), [Literal("Service 0")])
+        self.assertEqual(list(g.objects(services[0], RDF.type)), [SDO.WebApplication])
+        self.assertEqual(list(g.objects(services[0], SDO.description)), [Literal("Second")])
+        self.assertEqual(list(g.objects(services[1], SDO.name)), [Literal("Known")])
+        self.assertEqual(list(g.objects(services[1], SDO.description)), [Literal("Second")])
+
+
+class GitAPITest(unittest.TestCase):
+    """Concurrent, rate limited querying of the git API (against a local stub server)"""
+
+    def setUp(self):
+        self.server = start_stub_server({
+            "/repos/org/a": { "name": "a", "html_url": "https://github.com/org/a", "owner": { "login": "org" } },
+            "/repos/org/b": { "name": "b", "html_url": "https://github.com/org/b", "owner": { "login": "org" } },
+            "/users/org": { "type": "Organization", "login": "org", "name": "The Organization" },
+            "/repos/other/c": { "name": "c", "html_url": "https://github.com/other/c", "owner": { "login": "other" } },
+            "/users/other": { "type": "Organization", "login": "other", "name": "The Organization" },
+        })
+        self.server.headers = { "x-ratelimit-remaining": "100", "x-ratelimit-reset": str(int(time.time()) + 3600) }
+        self.github_api = codemeta.parsers.gitapi.GITHUB_API
+        codemeta.parsers.gitapi.GITHUB_API = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        codemeta.parsers.gitapi.GITHUB_API = self.github_api
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test001_fetch_many(self):
+        """Testing fetching multiple repositories concurrently"""
+        args = AttribDict({ "no_cache": True })
+        sources = [ ("https://github.com/org/a", "github"), ("https://github.com/org/b", "github") ]
+        results = list(codemeta.parsers.gitapi.fetch_many(sources, args))
+        self.assertEqual([ (source, kind) for source, kind, _ in results ], sources)
+        for source, kind, responses in results:
+            g = Graph()
+            res = URIRef("http://example.org/software")
+            codemeta.parsers.gitapi.parse(g, res, source, kind, args, responses)
+            self.assertIn((res, SDO.name, Literal(source.split("/")[-1])), g)
+            self.assertEqual(g.value(g.value(res, SDO.producer), SDO.name), Literal("The Organization"))
+        #the owner is looked up only once
+        self.assertEqual(sorted(self.server.hits), ["/repos/org/a", "/repos/org/b", "/users/org"])
+        #the bucket is filled from the headers and drained locally by each request
+        self.assertIn(RATELIMITER.bucket(codemeta.parsers.gitapi.GITHUB_API).tokens, (97, 98, 99))
+
+    def test002_tokenbucket(self):
+        """Testing that an exhausted token bucket waits for the reset"""
+        bucket = TokenBucket()
+        self.assertEqual(bucket.acquire(1), 0)
+        bucket.update(1, time.time() + 0.2)
+        self.assertEqual(bucket.acquire(1), 0)
+        self.assertGreater(bucket.acquire(1), 0)
+        bucket.update(0, time.time() + 60)
+        self.assertRaises(RateLimitExceeded, bucket.acquire, 1)
+
+    def test003_graphql(self):
+        """Testing fetching multiple repositories in a single GraphQL request"""
+        repository = { "name": "a", "nameWithOwner": "org/a", "url": "https://github.com/org/a", "description": "Test", "homepageUrl": None, "createdAt": "2020-01-01T00:00:00Z", "pushedAt": "2024-01-01T00:00:00Z", "isArchived": False, "hasIssuesEnabled": True, "licenseInfo": { "spdxId": "MIT" }, "repositoryTopics": { "nodes": [ { "topic": { "name": "test" } } ] }, "releases": { "totalCount": 0, "nodes": [] }, "owner": { "__typename": "Organization", "login": "org", "name": "The Organization", "email": None, "websiteUrl": None } }
+        self.server.routes["/graphql"] = { "data": { "r0": repository, "r1": None }, "errors": [ { "message": "Could not resolve to a Repository" } ] }
+        args = AttribDict({ "no_cache": True, "github_graphql": True })
+        environ = dict(os.environ)
+        os.environ["GITHUB_TOKEN"] = "secret"
+        try:
+            results = codemeta.parsers.gitapi.fetch_github_graphql(["https://github.com/org/a", "https://github.com/org/c"], args)
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+        self.assertEqual(self.server.hits, ["/graphql"])
+        self.assertEqual(self.server.posted[0]["variables"], { "owner0": "org", "name0": "a", "owner1": "org", "name1": "c" })
+        self.assertEqual(list(results), ["https://github.com/org/a"])
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        codemeta.parsers.gitapi.parse(g, res, "https://github.com/org/a", "github", args, results["https://github.com/org/a"])
+        self.assertIn((res, SDO.name, Literal("a")), g)
+        self.assertIn((res, SDO.license, Literal("http://spdx.org/licenses/MIT")), g)
+        self.assertIn((res, SDO.keywords, Literal("test")), g)
+        self.assertIn((res, CODEMETA.issueTracker, Literal("https://github.com/org/a/issues")), g)
+        self.assertEqual(g.value(g.value(res, SDO.producer), SDO.name), Literal("The Organization"))
+
+    def test004_graphql_fallback(self):
+        """Testing that repositories fall back to the REST API when the GraphQL batch fails, and that the batch is found for unclean source URLs"""
+        repository = { "name": "a", "nameWithOwner": "org/a", "url": "https://github.com/org/a", "description": "Test", "homepageUrl": None, "createdAt": "2020-01-01T00:00:00Z", "pushedAt": "2024-01-01T00:00:00Z", "isArchived": False, "hasIssuesEnabled": True, "licenseInfo": None, "repositoryTopics": { "nodes": [] }, "releases": { "totalCount": 0, "nodes": [] }, "owner": { "__typename": "Organization", "login": "org", "name": "The Organization", "email": None, "websiteUrl": None } }
+        args = AttribDict({ "no_cache": True, "github_graphql": True })
+        sources = [ ("https://github.com/org/a/", "github"), ("https://github.com/org", "github") ]
+        environ = dict(os.environ)
+        os.environ["GITHUB_TOKEN"] = "secret"
+        try:
+            #no /graphql route, the query fails with 404
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = codemeta.parsers.gitapi.submit_many(executor, sources[:1], args)
+                repo_kind, responses = futures[sources[0]].result()
+            self.assertEqual(responses["repository"]["name"], "a")
+            self.assertIn("/repos/org/a", self.server.hits)
+            self.server.hits.clear()
+            self.server.routes["/graphql"] = { "data": { "r0": repository } }
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = codemeta.parsers.gitapi.submit_many(executor, sources, args)
+                repo_kind, responses = futures[sources[0]].result()
+                futures[sources[1]].exception() #the source without a repository name is left out of the batch
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+        self.assertEqual(responses["repository"]["name"], "a")
+        self.assertEqual(self.server.posted[-1]["variables"], { "owner0": "org", "name0": "a" })
+        self.assertNotIn("/repos/org/a", self.server.hits)
+
+    def test005_owner_reuse(self):
+        """Testing that repositories of the same owner share the owner node, and owners with the same name do not"""
+        args = AttribDict({ "no_cache": True })
+        g = Graph()
+        for source in ("https://github.com/org/a", "https://github.com/org/b"):
+            res = URIRef("http://example.org/" + source.split("/")[-1])
+            codemeta.parsers.gitapi.parse(g, res, source, "github", args)
+        org = g.value(URIRef("http://example.org/a"), SDO.producer)
+        self.assertEqual(g.value(URIRef("http://example.org/b"), SDO.producer), org)
+        self.assertEqual(len(list(g.subjects(RDF.type, SDO.Organization))), 1)
+        self.assertEqual(self.server.hits.count("/users/org"), 1)
+        #the owner is also found when parsing into a separate graph, as build() does
+        newgraph = Graph()
+        res = URIRef("http://example.org/a2")
+        codemeta.parsers.gitapi.parse(newgraph, res, "https://github.com/org/a", "github", args, lookup=g)
+        self.assertIn((res, SDO.producer, org), newgraph)
+        self.assertNotIn((None, RDF.type, SDO.Organization), newgraph)
+        #a different user that happens to have the same name gets its own node
+        res = URIRef("http://example.org/c")
+        codemeta.parsers.gitapi.parse(g, res, "https://github.com/other/c", "github", args)
+        self.assertNotEqual(g.value(res, SDO.producer), org)
+        self.assertEqual(len(list(g.subjects(RDF.type, SDO.Organization))), 2)
+
+    def test006_background(self):
+        """Testing fetching in the background, including disambiguation of the repo kind"""
+        args = AttribDict({ "no_cache": True })
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = codemeta.parsers.gitapi.submit_many(executor, [("git@github.com:org/a.git", "gitapi")], args)
+            repo_kind, responses = futures[("git@github.com:org/a.git", "gitapi")].result()
+        self.assertEqual(repo_kind, "github")
+        self.assertEqual(responses["repository"]["name"], "a")
+
+    def test007_gitlab_owner(self):
+        """Testing that GitLab owners are identified by their user URL, not by their name"""
+        args = AttribDict({ "no_cache": True })
+        g = Graph()
+        for user in ("jdoe", "jdoe2", "jdoe"):
+            res = URIRef("http://example.org/" + user)
+            responses = { "repository": { "name": "x", "namespace": { "kind": "user", "name": "John Doe", "web_url": "https://gitlab.com/" + user } } }
+            codemeta.parsers.gitapi.parse(g, res, f"https://gitlab.com/{user}/x", "gitlab", args, responses)
+        self.assertEqual(sorted(str(node) for node in g.subjects(RDF.type, SDO.Person)), ["https://gitlab.com/jdoe", "https://gitlab.com/jdoe2"])
+        self.assertEqual(len(list(g.objects(URIRef("https://gitlab.com/jdoe"), SDO.url))), 1)
+
+
+class ForgeKindTest(unittest.TestCase):
+    """Detection of the kind of git forge a host runs"""
+
+    def setUp(self):
+        self.server = start_stub_server({ "/-/manifest.json": { "short_name": "GitLab" } })
+        self.host = f"127.0.0.1:{self.server.server_port}"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.forge_cache = codemeta.parsers.gitapi.FORGE_CACHE
+        codemeta.parsers.gitapi.FORGE_CACHE = os.path.join(self.tmpdir.name, "forges.json")
+
+    def tearDown(self):
+        codemeta.parsers.gitapi.FORGE_CACHE = self.forge_cache
+        codemeta.parsers.gitapi.FORGES.pop(self.host, None)
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test001_known(self):
+        """Testing known and configured forges"""
+        self.assertEqual(codemeta.parsers.gitapi.get_repo_kind("https://github.com/proycon/codemetapy"), "github")
+        self.assertEqual(codemeta.parsers.gitapi.get_repo_kind("https://codeberg.org/x/y"), None)
+        codemeta.parsers.gitapi.FORGES.update(codemeta.parsers.gitapi.parse_forges(f"{self.host}=none"))
+        self.assertEqual(codemeta.parsers.gitapi.get_repo_kind(f"http://{self.host}/x/y"), None)
+        self.assertEqual(self.server.hits, [])
+        self.assertRaises(ValueError, codemeta.parsers.gitapi.parse_forges, "example.org=svn")
+
+    def test002_probe(self):
+        """Testing that the outcome of probing a host is persisted"""
+        self.assertEqual(codemeta.parsers.gitapi.get_repo_kind(f"http://{self.host}/x/y"), "gitlab")
+        del codemeta.parsers.gitapi.repo_type_cache[f"http://{self.host}/"] #as if this is a new run
+        self.assertEqual(codemeta.parsers.gitapi.get_repo_kind(f"http://{self.host}/x/z"), "gitlab")
+        self.assertEqual(self.server.hits, ["/-/manifest.json"])
+
+    def test003_concurrent(self):
+        """Testing that the forge cache survives concurrent writers"""
+        def store(n):
+            for i in range(50):
+                codemeta.parsers.gitapi._store_forge_kind(f"https://host{n}-{i}/", "gitlab")
+        threads = [ threading.Thread(target=store, args=(n,)) for n in range(4) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(codemeta.parsers.gitapi._load_forge_cache()), 200)
+
+
+class RecordReplayTest(unittest.TestCase):
+    """Recording remote requests to a cassette and replaying them offline"""
+
+    def setUp(self):
+        self.server = start_stub_server({
+            "/repos/org/a": { "name": "a", "html_url": "https://github.com/org/a", "owner": { "login": "org" } },
+            "/users/org": { "type": "Organization", "login": "org", "name": "The Organization" },
+            "/repos/other/c": { "name": "c", "html_url": "https://github.com/other/c", "owner": { "login": "other" } },
+            "/users/other": { "type": "Organization", "login": "other", "name": "The Organization" },
+        })
+        self.github_api = codemeta.parsers.gitapi.GITHUB_API
+        codemeta.parsers.gitapi.GITHUB_API = f"http://127.0.0.1:{self.server.server_port}"
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        codemeta.remote.CASSETTE = None
+        codemeta.parsers.gitapi.GITHUB_API = self.github_api
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def harvest(self):
+        args = AttribDict({})
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futures = codemeta.parsers.gitapi.submit_many(executor, [("https://github.com/org/a", "github")], args)
+            repo_kind, responses = futures[("https://github.com/org/a", "github")].result()
+        g = Graph()
+        res = URIRef("http://example.org/software")
+        codemeta.parsers.gitapi.parse(g, res, "https://github.com/org/a", repo_kind, args, responses)
+        return g, res
+
+    def test001_record_replay(self):
+        """Testing that a recorded harvest replays identically without the server"""
+        codemeta.remote.CASSETTE = Cassette(self.tmpdir.name, "record")
+        g, res = self.harvest()
+        self.assertEqual(sorted(self.server.hits), ["/repos/org/a", "/users/org"])
+        self.server.shutdown()
+        self.server.server_close()
+        #forget the owners looked up in this process, so they have to come from the cassette as well
+        codemeta.parsers.gitapi.user_cache.clear()
+        codemeta.remote.CASSETTE = Cassette(self.tmpdir.name, "replay")
+        g2, res2 = self.harvest()
+        self.assertIn((res2, SDO.name, Literal("a")), g2)
+        self.assertEqual(g2.value(g2.value(res2, SDO.producer), SDO.name), Literal("The Organization"))
+        self.assertEqual(len(g), len(g2))
+
+    def test002_miss(self):
+        """Testing that a request that was never recorded fails in replay mode"""
+        codemeta.remote.CASSETTE = Cassette(self.tmpdir.name, "replay")
+        with self.assertRaises(CassetteMiss):
+            fetch(f"{codemeta.parsers.gitapi.GITHUB_API}/repos/org/a")
+        self.assertEqual(self.server.hits, [])
+
+    def test003_latency(self):
+        """Testing injected latency and that request bodies are part of the key"""
+        url = f"{codemeta.parsers.gitapi.GITHUB_API}/repos/org/a"
+        codemeta.remote.CASSETTE = Cassette(self.tmpdir.name, "record")
+        fetch(url, method="POST", json={ "query": "a" })
+        codemeta.remote.CASSETTE = Cassette(self.tmpdir.name, "replay", latency=0.2)
+        begintime = time.monotonic()
+        self.assertEqual(fetch(url, method="POST", json={ "query": "a" }).status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - begintime, 0.2)
+        with self.assertRaises(CassetteMiss):
+            fetch(url, method="POST", json={ "query": "b" })
+        with self.assertRaises(ValueError):
+            Cassette(self.tmpdir.name, "rewind")
+
+    def test004_restore(self):
+        """Testing that a cassette is only active within its context"""
+        cassette = Cassette(self.tmpdir.name, "replay")
+        with codemeta.remote.use_cassette(cassette):
+            self.assertIs(codemeta.remote.get_cassette(), cassette)
+            with codemeta.remote.use_cassette(None):
+                self.assertIs(codemeta.remote.get_cassette(), cassette)
+        self.assertIsNone(codemeta.remote.get_cassette())
+
+
+class GraphTest_NDJSON(unittest.TestCase):
+    """Read multiple resources into one graph and serialise as line-delimited JSON-LD"""
+
+    def setUp(self):
+        self.g, self.res, self.args, self.contextgraph = read(inputsources=["frog.codemeta.json", "withid.codemeta.json"], graph=True)
+
+    def test001_lines(self):
+        """Test whether we get one self-contained document per resource"""
+        s = serialize(self.g, self.res, AttribDict({ "output": "ndjson" }), self.contextgraph)
+        lines = s.split("\n")
+        self.assertEqual(len(lines), 2, "Testing number of lines")
+        for line in lines:
+            data = json.loads(line)
+            self.assertIn(CODEMETA_SOURCE, data['@context'], "Testing codemeta in context")
+            self.assertEqual(data['@type'], "SoftwareSourceCode", "Testing type")
+        self.assertIn("Frog", [ json.loads(line)['name'] for line in lines ])
+
+    def test002_stdout(self):
+        """Test whether lines are written to standard output as they are produced"""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            result = serialize(self.g, self.res, AttribDict({ "output": "ndjson", "outputfile": "-" }), self.contextgraph)
+        self.assertIsNone(result)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 2, "Testing number of lines")
+        self.assertEqual(sorted(lines), sorted(serialize(self.g, self.res, AttribDict({ "output": "ndjson" }), self.contextgraph).split("\n")))
+
+    def test003_parallel(self):
+        """Test whether framing in parallel gives output identical to framing serially"""
+        serial = serialize(self.g, self.res, AttribDict({ "output": "ndjson", "jobs": 1 }), self.contextgraph)
+        parallel = serialize(self.g, self.res, AttribDict({ "output": "ndjson", "jobs": 2 }), self.contextgraph)
+        self.assertEqual(parallel, serial)
+
+    def test004_parallel_json(self):
+        """Test whether parallel serialisation is refused for json output"""
+        with self.assertRaises(ValueError):
+            serialize(self.g, self.res, AttribDict({ "output": "json", "jobs": 2 }), self.contextgraph)
+
 
 if __name__ == '__main__':
     unittest.main()